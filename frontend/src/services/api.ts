@@ -114,10 +114,20 @@ export class CollectionAPI {
     }
   }
 
+  private static readonly CARDS_PAGE_SIZE = 500;
+
   static async getSetCards(setName: string) {
-    const response = await fetch(`${API_BASE_URL}/api/set/${encodeURIComponent(setName)}/cards`);
-    if (!response.ok) throw new Error('Failed to fetch set cards');
-    return response.json();
+    // The API returns one page at a time; follow X-Next-Cursor until the set is complete
+    const url = `${API_BASE_URL}/api/set/${encodeURIComponent(setName)}/cards?limit=${this.CARDS_PAGE_SIZE}`;
+    const cards: any[] = [];
+    let cursor: string | null = null;
+    do {
+      const response: Response = await fetch(cursor ? `${url}&cursor=${encodeURIComponent(cursor)}` : url);
+      if (!response.ok) throw new Error('Failed to fetch set cards');
+      cards.push(...await response.json());
+      cursor = response.headers.get('X-Next-Cursor');
+    } while (cursor);
+    return cards;
   }
 
   static async updateCard(scryfallId: string, quantities: { quantity: number; foil_quantity: number }) {
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# Shared tooling lives in utils/tools at the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'utils', 'tools'))
+from card_catalog import CardCatalog
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DATABASE = os.path.join(BASE_DIR, 'collection.db')  # Same database as the collection API
+SCRYFALL_DATA = os.path.join(BASE_DIR, 'default-cards.json')  # Where the API's import looks for it
+
+BATCH_SIZE = 16  # Most images Vision accepts in one batch_annotate_images request
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+PROGRESS_INTERVAL = 100  # Report throughput every N images
+
+
+class VisionOcr:
+    """Text detection through one shared Google Vision client."""
+
+    def __init__(self):
+        from google.cloud import vision  # Only needed when talking to the real API
+        self.vision = vision
+        self.client = vision.ImageAnnotatorClient()
+        self.feature = vision.Feature(type_=vision.Feature.Type.TEXT_DETECTION)
+
+    def detect_batch(self, paths, contents):
+        """Full detected text for each image (None where nothing was found or the image failed)"""
+        requests = [
+            self.vision.AnnotateImageRequest(image=self.vision.Image(content=content), features=[self.feature])
+            for content in contents
+        ]
+        response = self.client.batch_annotate_images(requests=requests)
+        texts = []
+        for path, result in zip(paths, response.responses):
+            if result.error.message:
+                print(f"Error from Vision API for {path}: {result.error.message}")
+                texts.append(None)
+            else:
+                texts.append(result.text_annotations[0].description if result.text_annotations else None)
+        return texts
+
+
+class StubOcr:
+    """Local stand-in for Vision, for benchmarking without credentials or network.
+
+    The "detected text" is the card name taken from the file name
+    (<card name>[__anything].jpg, underscores read as spaces), returned
+    after a fixed per-request latency.
+    """
+
+    def __init__(self, latency: float = 0.8):
+        self.latency = latency
+
+    def detect_batch(self, paths, contents):
+        time.sleep(self.latency)
+        return [os.path.splitext(os.path.basename(p))[0].split('__')[0].replace('_', ' ') + "\n"
+                for p in paths]
+
+
+def extract_card_name(text):
+    """The card name is the first line of the detected text."""
+    if not text:
+        return None
+    return text.split('\n')[0].strip() or None
+
+
+def iter_images(source):
+    """Image paths from a directory (sorted) or, with '-', one path per line on stdin"""
+    if source == '-':
+        for line in sys.stdin:
+            path = line.strip()
+            if path:
+                yield path
+        return
+    for root, _, files in os.walk(source):
+        for file in sorted(files):
+            if file.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.join(root, file)
+
+
+def iter_batches(paths, size=BATCH_SIZE):
+    batch = []
+    for path in paths:
+        batch.append(path)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def read_batch(paths):
+    contents = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            contents.append(f.read())
+    return contents
+
+
+class ScanStats:
+    """Counters shared by the OCR workers"""
+
+    def __init__(self):
+        self.started = time.time()
+        self.images = 0
+        self.resolved = 0
+        self.no_text = 0
+        self.failed = 0  # Images in batches whose read or OCR request failed
+        self.unknown = Counter()
+        self.lock = threading.Lock()
+
+    def cards_per_minute(self):
+        return self.images / max(time.time() - self.started, 1e-6) * 60
+
+
+def scan(source, ocr, catalog, set_name=None, concurrency=4):
+    """OCR every image under source in batches and resolve them to Scryfall ids.
+
+    Up to `concurrency` batch requests are in flight at once; images are
+    read only when their batch is submitted. A batch that can't be read or
+    OCR'd is counted as failed and the scan carries on. Returns
+    (Counter of ids, stats).
+    """
+    stats = ScanStats()
+    found = Counter()
+    names = {}  # Cache of name -> id, scans repeat the same commons a lot
+    catalog_lock = threading.Lock()  # The catalog's SQLite connection isn't safe for concurrent use
+
+    def process(paths):
+        try:
+            texts = ocr.detect_batch(paths, read_batch(paths))
+        except Exception as e:
+            print(f"Error scanning batch starting at {paths[0]}: {e}")
+            with stats.lock:
+                stats.images += len(paths)
+                stats.failed += len(paths)
+            return
+        for path, text in zip(paths, texts):
+            name = extract_card_name(text)
+            card_id = None
+            if name:
+                with catalog_lock:
+                    if name not in names:
+                        names[name] = catalog.lookup_name(name, set_name)
+                    card_id = names[name]
+            with stats.lock:
+                stats.images += 1
+                if not name:
+                    stats.no_text += 1
+                elif card_id is None:
+                    stats.unknown[name] += 1
+                else:
+                    stats.resolved += 1
+                    found[card_id] += 1
+                if stats.images % PROGRESS_INTERVAL == 0:
+                    print(f"  {stats.images} images scanned, {stats.cards_per_minute():.0f} cards/min")
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = set()
+        for batch in iter_batches(iter_images(source)):
+            if len(pending) >= concurrency:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+            pending.add(executor.submit(process, batch))
+        for future in pending:
+            future.result()
+
+    return found, stats
+
+
+def write_quantities(found, foil=False, database=DATABASE):
+    """Add scanned copies to the collection in one transaction; returns ids missing from the db"""
+    column = 'foil_quantity' if foil else 'quantity'
+    conn = sqlite3.connect(database, isolation_level=None, timeout=30)
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        known = set()
+        ids = list(found)
+        for start in range(0, len(ids), 500):  # Stay under SQLite's variable limit
+            chunk = ids[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            known.update(row[0] for row in conn.execute(
+                f'SELECT scryfall_id FROM cards WHERE scryfall_id IN ({placeholders})', chunk))
+        conn.executemany(
+            f'UPDATE cards SET {column} = {column} + ?, last_updated = CURRENT_TIMESTAMP WHERE scryfall_id = ?',
+            [(count, card_id) for card_id, count in found.items() if card_id in known]
+        )
+        conn.execute('COMMIT')
+    except Exception:
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
+    return [card_id for card_id in found if card_id not in known]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Scan a directory of card photos into the collection")
+    parser.add_argument('source', help="Directory of card images, or '-' to read image paths from stdin")
+    parser.add_argument('--bulk-file', default=SCRYFALL_DATA, help="Scryfall bulk file behind the local catalog")
+    parser.add_argument('--database', default=DATABASE, help="Collection database to update")
+    parser.add_argument('--set', dest='set_name', help="Prefer printings from this set (e.g. when scanning a set box)")
+    parser.add_argument('--foil', action='store_true', help="Count the scanned cards as foils")
+    parser.add_argument('--concurrency', type=int, default=4, help="Batch requests in flight at once (default: 4)")
+    parser.add_argument('--dry-run', action='store_true', help="Resolve cards but don't write to the database")
+    parser.add_argument('--stub', action='store_true', help="Use a local Vision stub (card name from file name)")
+    parser.add_argument('--stub-latency', type=float, default=0.8, help="Seconds per stub batch request")
+    args = parser.parse_args()
+
+    catalog = CardCatalog(args.bulk_file)
+    ocr = StubOcr(args.stub_latency) if args.stub else VisionOcr()
+
+    print(f"Scanning {args.source}...")
+    found, stats = scan(args.source, ocr, catalog, args.set_name, args.concurrency)
+    elapsed = time.time() - stats.started
+
+    print(f"\nScanned {stats.images} images in {elapsed:.1f}s ({stats.cards_per_minute():.0f} cards/min)")
+    print(f"Resolved: {stats.resolved}, no text: {stats.no_text}, unknown names: {sum(stats.unknown.values())}, "
+          f"failed: {stats.failed}")
+    for name, count in stats.unknown.most_common(10):
+        print(f"  Unknown: {name!r} x{count}")
+
+    if found and not args.dry_run:
+        missing = set(write_quantities(found, args.foil, args.database))
+        added = sum(count for card_id, count in found.items() if card_id not in missing)
+        print(f"Added {added} cards ({len(found) - len(missing)} printings) to {args.database}")
+        if missing:
+            print(f"{len(missing)} printings are not in the database yet; run the API import first")
@@ -1,11 +1,19 @@
 #!/usr/bin/env python3
 
+import argparse
 import io
 import os
 import requests
-import time
+import sys
 from google.cloud import vision
 
+# Shared tooling lives in utils/tools at the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'utils', 'tools'))
+from scryfall_cache import MISSING, ResponseCache, cache_key
+from scryfall_client import get_client
+from card_catalog import CardCatalog
+from image_index import IMAGE_DIR, ImageIndex
+
 # Set up Google Cloud credentials with absolute path
 credentials_path = '/home/gluth/mtg-collection/service_account.json'
 os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = credentials_path
@@ -18,19 +26,43 @@ if not os.path.exists(credentials_path):
 class ScryfallAPI:
     """Handle Scryfall API interactions with rate limiting."""
 
-    BASE_URL = "https://api.scryfall.com"
+    _cache = None
+
+    @classmethod
+    def cache(cls):
+        """Persistent response cache shared with the collection scripts"""
+        if cls._cache is None:
+            cls._cache = ResponseCache()
+        return cls._cache
 
     @staticmethod
     def search_card(query):
-        """Search for all printings of a card on Scryfall."""
-        try:
-            # Add a small delay to respect rate limits
-            time.sleep(0.1)
+        """Search for all printings of a card, using the on-disk cache when possible."""
+        key = cache_key("search-prints", query)
+        cached = ScryfallAPI.cache().get(key)
+        if cached is not MISSING:
+            print(f"Using cached Scryfall results for: {query}")
+            return cached
+
+        printings = ScryfallAPI.fetch_printings(query)
+        if printings is not MISSING:
+            ScryfallAPI.cache().set(key, printings)
+            return printings
+        return None
+
+    @staticmethod
+    def fetch_printings(query):
+        """Search for all printings of a card on Scryfall.
 
+        Returns the printings, None when Scryfall has no such card, or
+        MISSING when the request failed and the result shouldn't be cached.
+        """
+        try:
+            # The shared client handles rate limiting and retries
             # First try exact match
             print(f"Querying Scryfall API with exact match: {query}")
-            response = requests.get(
-                f"{ScryfallAPI.BASE_URL}/cards/search",
+            response = get_client().get(
+                "/cards/search",
                 params={
                     "q": f"!\"{query}\"",
                     "order": "released",
@@ -46,8 +78,8 @@ class ScryfallAPI:
             # If exact match fails, try fuzzy search
             if response.status_code == 404:
                 print("No exact matches found, trying fuzzy search...")
-                response = requests.get(
-                    f"{ScryfallAPI.BASE_URL}/cards/search",
+                response = get_client().get(
+                    "/cards/search",
                     params={
                         "q": query,
                         "order": "released",
@@ -59,11 +91,13 @@ class ScryfallAPI:
                     if data.get('data'):
                         return data['data']
 
-            return None
+            if response.status_code in (200, 404):
+                return None
+            return MISSING
 
         except requests.exceptions.RequestException as e:
             print(f"Error querying Scryfall API: {e}")
-            return None
+            return MISSING
 
 def detect_text(image_path):
     """Detects text in an image using Google Vision API."""
@@ -120,10 +154,34 @@ def extract_card_name(text):
 
     return card_name
 
-def process_image(image_path):
-    """Processes an image to identify the Magic card."""
+def identify_locally(image_path, index, catalog=None):
+    """Identify the exact printing from the local art index, or None if the match is weak."""
+    match = index.identify(image_path)
+    if match is None:
+        return None
+
+    print(f"\nMatched local image index: {match.scryfall_id} (confidence {match.confidence:.2f})")
+    card = catalog.get(match.scryfall_id) if catalog is not None else None
+    if card is not None:
+        print(f"Name: {card.name}")
+        print(f"Set: {card.set_name} ({card.set.upper()})")
+        print(f"Rarity: {card.rarity}")
+        print(f"Collector Number: {card.collector_number}")
+    return match
+
+def process_image(image_path, index=None, catalog=None):
+    """Processes an image to identify the Magic card.
+
+    When a local image index is given it is tried first; Vision OCR and the
+    Scryfall search only run if no indexed art is close enough.
+    """
     print(f"\nProcessing image: {image_path}")
 
+    if index is not None:
+        if identify_locally(image_path, index, catalog):
+            return
+        print("No confident local match, falling back to OCR...")
+
     detected_text = detect_text(image_path)
     if detected_text:
         print(f"\nDetected raw text: {detected_text}")
@@ -158,5 +216,20 @@ def process_image(image_path):
         print("No text detected in the image")
 
 if __name__ == "__main__":
-    test_image = input("Enter path to card image: ")
-    process_image(test_image)
+    parser = argparse.ArgumentParser(description="Identify a Magic card from a photo")
+    parser.add_argument("image", nargs="?", help="Path to the card image (prompted for if omitted)")
+    parser.add_argument("--image-dir", default=IMAGE_DIR,
+                        help="Art crops named <scryfall_id>.jpg used for offline matching")
+    parser.add_argument("--bulk-file", help="Scryfall bulk file used to name locally matched printings")
+    parser.add_argument("--no-index", action="store_true", help="Always use Vision OCR")
+    args = parser.parse_args()
+
+    index = None
+    if not args.no_index and os.path.isdir(args.image_dir):
+        index = ImageIndex.open(args.image_dir)
+        if not len(index):
+            index = None
+    catalog = CardCatalog(args.bulk_file) if args.bulk_file else None
+
+    test_image = args.image or input("Enter path to card image: ")
+    process_image(test_image, index, catalog)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import time
+from collections import namedtuple
+
+import numpy as np
+from PIL import Image
+
+# Art crops downloaded from Scryfall, named <scryfall_id>.jpg
+IMAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'storage', 'card-images')
+INDEX_FILE = 'phash-index.npz'
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+HASH_SIZE = 16  # 16x16 difference hash = 256 bits
+HASH_BYTES = HASH_SIZE * HASH_SIZE // 8
+MATCH_THRESHOLD = 48  # Max Hamming distance (of 256 bits) accepted without falling back to OCR
+MATCH_MARGIN = 16  # How much closer the best match must be than any other card's art
+
+# Where the art sits on a photographed card, as fractions of its width and
+# height (left, top, right, bottom). Matches the modern and old frames closely
+# enough for a perceptual hash.
+ART_BOX = (0.08, 0.11, 0.92, 0.55)
+
+# Bits set in each byte value, for vectorized Hamming distances
+POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+Match = namedtuple('Match', ['scryfall_id', 'distance', 'confidence'])
+
+
+def crop_art(image: Image.Image) -> Image.Image:
+    """Cut the art box out of a photo of a whole card"""
+    width, height = image.size
+    left, top, right, bottom = ART_BOX
+    return image.crop((int(left * width), int(top * height), int(right * width), int(bottom * height)))
+
+
+def dhash(image: Image.Image) -> np.ndarray:
+    """Difference hash of an image as HASH_BYTES packed bytes.
+
+    Each bit says whether a pixel of the downscaled grayscale image is
+    brighter than its right-hand neighbour, which survives rescaling,
+    JPEG artifacts and moderate lighting changes.
+    """
+    small = image.convert('L').resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS)
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = pixels[:, 1:] > pixels[:, :-1]
+    return np.packbits(bits.flatten())
+
+
+def hash_file(path: str, crop: bool = False) -> np.ndarray:
+    with Image.open(path) as image:
+        # Let the JPEG decoder downscale while decoding; the hash only needs a few pixels
+        image.draft('L', (HASH_SIZE * 16, HASH_SIZE * 16))
+        return dhash(crop_art(image) if crop else image)
+
+
+class ImageIndex:
+    """Nearest-neighbour lookup of card art by perceptual hash.
+
+    The index is built from the art crops in IMAGE_DIR and saved next to
+    them; rebuilding only hashes images that are new or modified since the
+    last build. Lookups compare a photo's hash against every stored hash
+    in one vectorized pass.
+    """
+
+    def __init__(self, ids=None, hashes=None, mtimes=None):
+        self.ids = np.asarray(ids if ids is not None else [], dtype=object)
+        self.hashes = hashes if hashes is not None else np.zeros((0, HASH_BYTES), dtype=np.uint8)
+        self.mtimes = np.asarray(mtimes if mtimes is not None else [], dtype=np.float64)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def load(cls, path: str) -> 'ImageIndex':
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['ids'].astype(object), data['hashes'], data['mtimes'])
+
+    def save(self, path: str):
+        temp_path = path + '.tmp.npz'
+        np.savez(temp_path, ids=self.ids.astype(str), hashes=self.hashes, mtimes=self.mtimes)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def build(cls, image_dir: str = IMAGE_DIR, previous: 'ImageIndex' = None) -> 'ImageIndex':
+        """Hash every image in image_dir, reusing hashes from a previous index for unchanged files"""
+        started = time.time()
+        known = {}
+        if previous is not None:
+            known = {card_id: (mtime, row) for row, (card_id, mtime) in enumerate(zip(previous.ids, previous.mtimes))}
+
+        ids, hashes, mtimes = [], [], []
+        hashed = 0
+        for file in sorted(os.listdir(image_dir)):
+            card_id, extension = os.path.splitext(file)
+            if extension.lower() not in IMAGE_EXTENSIONS:
+                continue
+            path = os.path.join(image_dir, file)
+            mtime = os.path.getmtime(path)
+            if card_id in known and known[card_id][0] == mtime:
+                file_hash = previous.hashes[known[card_id][1]]
+            else:
+                try:
+                    file_hash = hash_file(path)
+                except OSError as e:
+                    print(f"Skipping unreadable image {file}: {e}")
+                    continue
+                hashed += 1
+            ids.append(card_id)
+            hashes.append(file_hash)
+            mtimes.append(mtime)
+
+        index = cls(ids, np.array(hashes, dtype=np.uint8).reshape(-1, HASH_BYTES), mtimes)
+        print(f"Indexed {len(index)} images ({hashed} newly hashed) in {time.time() - started:.1f}s")
+        return index
+
+    @classmethod
+    def open(cls, image_dir: str = IMAGE_DIR, rebuild: bool = True) -> 'ImageIndex':
+        """Load the saved index for image_dir, refreshing it first when rebuild is set"""
+        path = os.path.join(image_dir, INDEX_FILE)
+        index = cls.load(path) if os.path.exists(path) else None
+        if rebuild:
+            index = cls.build(image_dir, index)
+            index.save(path)
+        return index
+
+    def distances(self, query_hash: np.ndarray) -> np.ndarray:
+        """Hamming distance from a hash to every stored hash"""
+        return POPCOUNT[np.bitwise_xor(self.hashes, query_hash)].sum(axis=1, dtype=np.int32)
+
+    def nearest(self, query_hash: np.ndarray, k: int = 1) -> list:
+        """The k closest images to a hash, as Match tuples sorted by distance"""
+        if not len(self):
+            return []
+        distances = self.distances(query_hash)
+        k = min(k, len(distances))
+        closest = np.argpartition(distances, k - 1)[:k]
+        closest = closest[np.argsort(distances[closest])]
+        bits = HASH_BYTES * 8
+        return [Match(self.ids[i], int(distances[i]), float(1 - distances[i] / bits)) for i in closest]
+
+    def identify(self, image_path: str, crop: bool = True, threshold: int = MATCH_THRESHOLD,
+                 margin: int = MATCH_MARGIN):
+        """Best match for a photo of a card, or None if it isn't both close and unambiguous.
+
+        Reprints often share art, so the best match must also beat the
+        nearest image of any other card by at least `margin` bits; near-ties
+        are left for OCR to settle.
+        """
+        if not len(self):
+            return None
+        distances = self.distances(hash_file(image_path, crop=crop))
+        best = int(np.argmin(distances))
+        if distances[best] > threshold:
+            return None
+        others = distances[self.ids != self.ids[best]]
+        if len(others) and others.min() - distances[best] < margin:
+            return None
+        return Match(self.ids[best], int(distances[best]), float(1 - distances[best] / (HASH_BYTES * 8)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build or query the perceptual-hash index of card art")
+    parser.add_argument('--image-dir', default=IMAGE_DIR, help="Directory of <scryfall_id>.jpg art crops")
+    parser.add_argument('images', nargs='*', help="Card photos to look up after building the index")
+    args = parser.parse_args()
+
+    index = ImageIndex.open(args.image_dir)
+    for image_path in args.images:
+        started = time.perf_counter()
+        matches = index.nearest(hash_file(image_path, crop=True), k=3)
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"\n{image_path} ({elapsed:.1f} ms):")
+        for match in matches:
+            print(f"  {match.scryfall_id}  distance={match.distance}  confidence={match.confidence:.2f}")
@@ -1,73 +1,283 @@
-from flask import Flask, render_template, jsonify, request, make_response
+from flask import Flask, render_template, jsonify, request, make_response, url_for, g
 import sqlite3
 import json
-import csv
+import hashlib
+import logging
 import os
+import random
+import sys
+import time
+import queue
+import atexit
+from contextlib import contextmanager
 from datetime import datetime
 from functools import wraps
+from logging.handlers import QueueHandler, QueueListener
 from threading import Lock
+from urllib.request import pathname2url
 from cachetools import TTLCache
 
 app = Flask(__name__)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATABASE = os.path.join(BASE_DIR, 'collection.db')
 
-# Add connection pooling
+# Shared tooling lives in utils/tools at the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(BASE_DIR), 'utils', 'tools'))
+from card_catalog import CardCatalog
+from csv_loader import load_csv_rows
+
+# Connection pooling: one pool of writer connections and one of read-only
+# reader connections, created lazily for the current DATABASE
 DB_POOL = {}
 DB_POOL_LOCK = Lock()
+DB_WRITER_POOL_SIZE = int(os.environ.get('DB_WRITER_POOL_SIZE', 4))
+DB_READER_POOL_SIZE = int(os.environ.get('DB_READER_POOL_SIZE', 16))
+DB_BUSY_TIMEOUT = 30  # Seconds to wait for a lock held by another connection
+DB_POOL_TIMEOUT = 30  # Seconds to wait for a free pooled connection
 STATS_CACHE = TTLCache(maxsize=1, ttl=5)  # Cache stats for 5 seconds
+SET_STATS_CACHE = TTLCache(maxsize=1024, ttl=60)  # Per-set stats, invalidated on updates
+CACHE_LOCK = Lock()
+
+def database_signature():
+    """Cheap fingerprint of the database files, used to notice writes made by other processes"""
+    signature = []
+    for path in (DATABASE, DATABASE + '-wal'):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            stat = None
+        # An empty WAL is created whenever a connection opens; it holds no changes
+        if stat is None or stat.st_size == 0:
+            signature.append(None)
+        else:
+            signature.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+class ChangeTracker:
+    """Monotonic change counters for the whole collection and for each set.
+
+    Counters live in memory so conditional requests can be answered without
+    a database query. The epoch makes ETags from a previous server run
+    invalid, and the database file signature catches commits made by other
+    processes (such as a CLI import), which invalidate everything.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._epoch = f"{os.getpid():x}{time.time_ns():x}"
+        self._total = 0
+        self._generation = 0  # Bumped when every set changes at once
+        self._sets = {}
+        self._modified = time.time()
+        self._generation_modified = self._modified
+        self._set_modified = {}
+        self._signature = None
+
+    def _check_external(self, signature=None):
+        """Invalidate everything if the database files changed since the recorded signature.
+
+        Writers pass the signature taken once they held the write lock, so
+        their own commit isn't mistaken for another process's.
+        """
+        if signature is None:
+            signature = database_signature()
+        if self._signature is not None and signature != self._signature:
+            # Another process wrote the database: cached stats are stale too, and
+            # must go in the same step so no response pairs old data with a new ETag
+            with CACHE_LOCK:
+                STATS_CACHE.clear()
+                SET_STATS_CACHE.clear()
+            self._bump_all()
+        self._signature = signature
+
+    def _bump_all(self):
+        self._total += 1
+        self._generation += 1
+        self._modified = self._generation_modified = time.time()
+
+    def bump(self, set_names, before=None):
+        """Record a change to cards in the given sets.
+
+        before is the database signature from just before the write; a write
+        by another process since the last check invalidates every set first.
+        Without it, the writer's own commit counts as external too.
+        """
+        with self._lock:
+            self._check_external(before)
+            now = time.time()
+            self._total += 1
+            self._modified = now
+            for set_name in set_names:
+                self._sets[set_name] = self._sets.get(set_name, 0) + 1
+                self._set_modified[set_name] = now
+            self._signature = database_signature()
+
+    def bump_all(self):
+        """Record a change that may touch any set, such as an import.
+
+        Every set is invalidated anyway, so earlier external writes can't be lost.
+        """
+        with self._lock:
+            self._bump_all()
+            self._signature = database_signature()
+
+    def version(self, set_name=None):
+        """Return (etag, last_modified) for the collection or a single set"""
+        with self._lock:
+            self._check_external()
+            if set_name is None:
+                return f"{self._epoch}-{self._total}", self._modified
+            etag = f"{self._epoch}-{self._generation}-{self._sets.get(set_name, 0)}"
+            modified = max(self._generation_modified, self._set_modified.get(set_name, 0))
+            return etag, modified
+
+CHANGES = ChangeTracker()
+
+def invalidate_caches(set_names, before=None):
+    """Drop cached stats affected by changes to cards in the given sets.
+
+    before is the database_signature() taken after the write lock was
+    acquired and before anything was written (see ChangeTracker.bump).
+    """
+    set_names = list(set_names)
+    with CACHE_LOCK:
+        STATS_CACHE.clear()
+        for set_name in set_names:
+            SET_STATS_CACHE.pop(set_name, None)
+    CHANGES.bump(set_names, before)
+
+def invalidate_all_caches():
+    """Drop every cached response after a change that may touch any set"""
+    with CACHE_LOCK:
+        STATS_CACHE.clear()
+        SET_STATS_CACHE.clear()
+    CHANGES.bump_all()
+
+# Structured request logging. Records are handed to a queue and written by a
+# background listener thread, so request threads never block on stdout.
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', 1.0))  # Fraction of successful requests logged
+
+logger = logging.getLogger('collection_api')
+
+class JsonFormatter(logging.Formatter):
+    """Format log records as one JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+def setup_logging():
+    """Attach a queue-backed JSON handler to the API logger"""
+    if logger.handlers:
+        return
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    logger.addHandler(QueueHandler(log_queue))
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
+
+setup_logging()
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def log_request(response):
+    """Log one sampled record per request with its latency"""
+    started = g.pop('request_started', None)
+    if started is None:
+        return response
+    # Always keep failures; sample the rest
+    if response.status_code < 400 and random.random() >= LOG_SAMPLE_RATE:
+        return response
+    level = logging.ERROR if response.status_code >= 500 else (
+        logging.WARNING if response.status_code >= 400 else logging.INFO)
+    if logger.isEnabledFor(level):
+        logger.log(level, 'request', extra={'fields': {
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'latency_ms': round((time.perf_counter() - started) * 1000, 2),
+            'bytes': response.calculate_content_length(),
+        }})
+    return response
 
 # CORS configuration
 ALLOWED_ORIGINS = ['http://localhost:5173', 'http://localhost:3000']
 
-def enable_cors(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        print(f"Handling request to: {request.path}")
-        print(f"Request headers: {dict(request.headers)}")
-        
-        response = make_response(f(*args, **kwargs))
-        
-        # Log response headers for debugging
-        print(f"Setting response headers for {request.path}:")
-        origin = request.headers.get('Origin')
-        if origin in ALLOWED_ORIGINS:
-            response.headers.add('Access-Control-Allow-Origin', origin)
-            print(f"- Added Access-Control-Allow-Origin: {response.headers['Access-Control-Allow-Origin']}")
-        
-        response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,Accept,Origin')
-        print(f"- Added Access-Control-Allow-Headers: {response.headers['Access-Control-Allow-Headers']}")
-        
-        response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
-        print(f"- Added Access-Control-Allow-Methods: {response.headers['Access-Control-Allow-Methods']}")
-        
-        response.headers.add('Access-Control-Allow-Credentials', 'true')
-        print(f"- Added Access-Control-Allow-Credentials: {response.headers['Access-Control-Allow-Credentials']}")
-        
-        response.headers.add('Access-Control-Max-Age', '3600')
-        print(f"- Added Access-Control-Max-Age: {response.headers['Access-Control-Max-Age']}")
-        
-        response.headers.add('Vary', 'Origin')
-        print(f"- Added Vary: {response.headers['Vary']}")
-        
-        print(f"Final response headers: {dict(response.headers)}")
-        return response
-    return decorated_function
+@app.after_request
+def add_cors_headers(response):
+    """Add CORS headers to every response, including preflight replies"""
+    origin = request.headers.get('Origin')
+    if origin in ALLOWED_ORIGINS:
+        response.headers['Access-Control-Allow-Origin'] = origin
+    response.headers['Access-Control-Allow-Headers'] = 'Content-Type,Authorization,Accept,Origin'
+    response.headers['Access-Control-Allow-Methods'] = 'GET,PUT,POST,DELETE,OPTIONS'
+    response.headers['Access-Control-Allow-Credentials'] = 'true'
+    response.headers['Access-Control-Max-Age'] = '3600'
+    response.headers['Access-Control-Expose-Headers'] = 'X-Next-Cursor, Link'
+    response.vary.add('Origin')
+    return response
+
+def conditional_get(per_set=False):
+    """Answer If-None-Match / If-Modified-Since from the change counters.
+
+    With per_set=True the validators come from the set named by the route's
+    set_name argument instead of the whole collection. Matching requests get
+    a 304 without running the view. The ETag is taken before the view reads
+    anything and left in g.etag, so views can tag cached data with it.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            etag, last_modified = CHANGES.version(kwargs['set_name'] if per_set else None)
+            g.etag = etag
+            # HTTP dates have one-second resolution, so a Last-Modified from the
+            # current second could be shared by a later change. It is only sent,
+            # and If-Modified-Since only honoured, once it is a full second old.
+            stable = time.time() - last_modified >= 1
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains(etag)
+            else:
+                since = request.if_modified_since
+                not_modified = stable and since is not None and int(last_modified) <= since.timestamp()
+
+            if not_modified:
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            if stable:
+                response.last_modified = last_modified
+            response.headers['Cache-Control'] = 'no-cache'  # Always revalidate
+            return response
+        return decorated_function
+    return decorator
 
 @app.before_request
 def handle_preflight():
     if request.method == "OPTIONS":
-        response = make_response()
-        origin = request.headers.get('Origin')
-        if origin in ALLOWED_ORIGINS:
-            response.headers.add('Access-Control-Allow-Origin', origin)
-        response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,Accept,Origin')
-        response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
-        response.headers.add('Access-Control-Allow-Credentials', 'true')
-        response.headers.add('Access-Control-Max-Age', '3600')
-        response.headers.add('Vary', 'Origin')
-        return response
-SCHEMA_VERSION = 2  # Increment this when schema changes
+        # CORS headers are added by add_cors_headers
+        return make_response()
+SCHEMA_VERSION = 6  # Increment this when schema changes
 SCRYFALL_DATA = '../default-cards.json'  # Updated to use parent directory
 
 def get_db_version(conn):
@@ -85,9 +295,157 @@ def needs_import(conn):
     except sqlite3.OperationalError:
         return True  # Only import if table doesn't exist
 
+# Per-set and per-set-per-rarity aggregates, kept current by triggers on
+# cards so the stats endpoints never have to scan the cards table
+SET_STATS_TABLES = {
+    'set_stats': ['set_name'],
+    'set_rarity_stats': ['set_name', 'rarity'],
+}
+
+def card_stats_values(ref):
+    """SQL expressions for one card's contribution to the aggregates"""
+    return {
+        'total_possible': '1',
+        'owned_cards': f'({ref}.quantity > 0 OR {ref}.foil_quantity > 0)',
+        'total_copies': f'({ref}.quantity + {ref}.foil_quantity)',
+        'total_value': (f'({ref}.quantity * COALESCE({ref}.price, 0) + '
+                        f'{ref}.foil_quantity * COALESCE({ref}.foil_price, 0))'),
+    }
+
+def set_stats_key_values(ref):
+    """SQL expressions for the aggregate keys of a card"""
+    return {'set_name': f'{ref}.set_name', 'rarity': f"COALESCE({ref}.rarity, '')"}
+
+def add_card_stats_sql(table, keys, ref):
+    """Trigger statement adding a card's contribution to an aggregate table"""
+    values = card_stats_values(ref)
+    key_values = set_stats_key_values(ref)
+    columns = keys + list(values)
+    return f'''
+        INSERT INTO {table} ({', '.join(columns)})
+        VALUES ({', '.join([key_values[k] for k in keys] + list(values.values()))})
+        ON CONFLICT({', '.join(keys)}) DO UPDATE SET
+            {', '.join(f'{c} = {c} + excluded.{c}' for c in values)};
+    '''
+
+def remove_card_stats_sql(table, keys, ref):
+    """Trigger statements removing a card's contribution from an aggregate table"""
+    values = card_stats_values(ref)
+    key_values = set_stats_key_values(ref)
+    where = ' AND '.join(f'{k} = {key_values[k]}' for k in keys)
+    return f'''
+        UPDATE {table} SET
+            {', '.join(f'{c} = {c} - {expr}' for c, expr in values.items())}
+        WHERE {where};
+        DELETE FROM {table} WHERE {where} AND total_possible <= 0;
+    '''
+
+def create_set_stats(conn):
+    """Create the aggregate tables and triggers, then fill them from cards"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS set_stats (
+            set_name TEXT PRIMARY KEY,
+            total_possible INTEGER NOT NULL DEFAULT 0,
+            owned_cards INTEGER NOT NULL DEFAULT 0,
+            total_copies INTEGER NOT NULL DEFAULT 0,
+            total_value REAL NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS set_rarity_stats (
+            set_name TEXT NOT NULL,
+            rarity TEXT NOT NULL,
+            total_possible INTEGER NOT NULL DEFAULT 0,
+            owned_cards INTEGER NOT NULL DEFAULT 0,
+            total_copies INTEGER NOT NULL DEFAULT 0,
+            total_value REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (set_name, rarity)
+        )
+    ''')
+
+    triggers = {
+        'cards_stats_insert': ('AFTER INSERT ON cards', [('add', 'NEW')]),
+        'cards_stats_delete': ('AFTER DELETE ON cards', [('remove', 'OLD')]),
+        'cards_stats_update': (
+            'AFTER UPDATE OF set_name, rarity, quantity, foil_quantity, price, foil_price ON cards',
+            [('remove', 'OLD'), ('add', 'NEW')]
+        ),
+    }
+    for trigger, (event, steps) in triggers.items():
+        body = ''
+        for action, ref in steps:
+            for table, keys in SET_STATS_TABLES.items():
+                if action == 'add':
+                    body += add_card_stats_sql(table, keys, ref)
+                else:
+                    body += remove_card_stats_sql(table, keys, ref)
+        conn.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        conn.execute(f'CREATE TRIGGER {trigger} {event} BEGIN {body} END')
+
+    rebuild_set_stats(conn)
+
+def rebuild_set_stats(conn):
+    """Recompute the aggregate tables from scratch"""
+    for table, keys in SET_STATS_TABLES.items():
+        key_values = set_stats_key_values('cards')
+        values = card_stats_values('cards')
+        conn.execute(f'DELETE FROM {table}')
+        conn.execute(f'''
+            INSERT INTO {table} ({', '.join(keys + list(values))})
+            SELECT {', '.join([key_values[k] for k in keys] + [f'SUM({v})' for v in values.values()])}
+            FROM cards
+            GROUP BY {', '.join(key_values[k] for k in keys)}
+        ''')
+
+def create_search_index(conn):
+    """Create the trigram full-text index over card names and its sync triggers"""
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS cards_fts USING fts5(
+            name,
+            content='cards',
+            content_rowid='id',
+            tokenize='trigram'
+        )
+    ''')
+    triggers = {
+        'cards_fts_insert': ('AFTER INSERT ON cards', '''
+            INSERT INTO cards_fts(rowid, name) VALUES (NEW.id, NEW.name);
+        '''),
+        'cards_fts_delete': ('AFTER DELETE ON cards', '''
+            INSERT INTO cards_fts(cards_fts, rowid, name) VALUES ('delete', OLD.id, OLD.name);
+        '''),
+        'cards_fts_update': ('AFTER UPDATE OF name ON cards', '''
+            INSERT INTO cards_fts(cards_fts, rowid, name) VALUES ('delete', OLD.id, OLD.name);
+            INSERT INTO cards_fts(rowid, name) VALUES (NEW.id, NEW.name);
+        '''),
+    }
+    for trigger, (event, body) in triggers.items():
+        conn.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        conn.execute(f'CREATE TRIGGER {trigger} {event} BEGIN {body} END')
+    conn.execute("INSERT INTO cards_fts(cards_fts) VALUES ('rebuild')")
+
+# Triggers maintaining derived tables. A full import drops them and rebuilds
+# the derived tables once at the end, which is far cheaper than per-row upkeep.
+DERIVED_TRIGGERS = [
+    'cards_stats_insert', 'cards_stats_delete', 'cards_stats_update',
+    'cards_fts_insert', 'cards_fts_delete', 'cards_fts_update',
+]
+
+def drop_derived_triggers(conn):
+    """Drop the triggers that keep derived tables in sync with cards"""
+    for trigger in DERIVED_TRIGGERS:
+        conn.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+
+def rebuild_derived_tables(conn):
+    """Recreate the sync triggers and rebuild every derived table from cards"""
+    create_set_stats(conn)
+    create_search_index(conn)
+
 def init_db():
     """Initialize or upgrade database"""
     with sqlite3.connect(DATABASE) as conn:
+        # WAL lets the API's reader connections run alongside a writer
+        conn.execute('PRAGMA journal_mode = WAL')
         current_version = get_db_version(conn)
         needs_card_import = needs_import(conn)
         
@@ -95,7 +453,7 @@ def init_db():
             # Fresh install
             print("Creating new database...")
             conn.execute('CREATE TABLE schema_version (version INTEGER)')
-            conn.execute('INSERT INTO schema_version VALUES (?)', [SCHEMA_VERSION])
+            conn.execute('INSERT INTO schema_version VALUES (?)', [2])
             
             conn.execute('''
                 CREATE TABLE IF NOT EXISTS cards (
@@ -120,9 +478,11 @@ def init_db():
             conn.execute('CREATE INDEX IF NOT EXISTS idx_name ON cards(name)')
             conn.execute('CREATE INDEX IF NOT EXISTS idx_set ON cards(set_name)')
             
-            return True  # Needs import
+            # Later versions are applied as upgrades below
+            current_version = 2
+            needs_card_import = True  # Needs import
             
-        elif current_version < SCHEMA_VERSION:
+        if current_version < SCHEMA_VERSION:
             # Upgrade existing database
             print(f"Upgrading database from version {current_version} to {SCHEMA_VERSION}...")
             if current_version == 1:
@@ -174,29 +534,144 @@ def init_db():
                 conn.execute('CREATE INDEX IF NOT EXISTS idx_name ON cards(name)')
                 conn.execute('CREATE INDEX IF NOT EXISTS idx_set ON cards(set_name)')
             
+            if current_version < 3:
+                # Content hash of the Scryfall-derived columns, used to find
+                # rows that changed during an incremental refresh
+                conn.execute('ALTER TABLE cards ADD COLUMN content_hash TEXT')
+            
+            if current_version < 4:
+                # Materialized per-set aggregates for the stats endpoints
+                create_set_stats(conn)
+            
+            if current_version < 5:
+                # Full-text search over card names
+                create_search_index(conn)
+            
+            if current_version < 6:
+                # Integer collector number for index-backed ordering/keyset paging
+                conn.execute('''
+                    ALTER TABLE cards ADD COLUMN collector_sort INTEGER
+                    GENERATED ALWAYS AS (CAST(COALESCE(collector_number, '') AS INTEGER)) VIRTUAL
+                ''')
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_set_collector ON cards(set_name, collector_sort)')
+            
             # Update schema version
             conn.execute('UPDATE schema_version SET version = ?', [SCHEMA_VERSION])
             
-            return needs_import(conn)  # Check if we need to import after upgrade
+            # Check if we need to import after upgrade
+            return needs_card_import or needs_import(conn)
         
         return needs_card_import  # Return initial import check result
 
+class ConnectionPool:
+    """Bounded pool of SQLite connections shared by request threads.
+
+    Connections are created on demand up to `size` and handed out one per
+    caller, so concurrent requests never share a handle or interleave
+    transactions on it.
+    """
+
+    def __init__(self, database, size, readonly=False):
+        self.database = database
+        self.size = size
+        self.readonly = readonly
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = Lock()
+
+    def _connect(self):
+        if self.readonly:
+            uri = f"file:{pathname2url(self.database)}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, timeout=DB_BUSY_TIMEOUT, check_same_thread=False)
+            conn.execute('PRAGMA query_only = ON')
+        else:
+            conn = sqlite3.connect(self.database, timeout=DB_BUSY_TIMEOUT, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = NORMAL')
+        conn.execute(f'PRAGMA busy_timeout = {DB_BUSY_TIMEOUT * 1000}')
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def acquire(self):
+        """Take an idle connection, opening a new one while under the size limit"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_create = self._created < self.size
+            if can_create:
+                self._created += 1
+        if can_create:
+            try:
+                return self._connect()
+            except sqlite3.Error:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=DB_POOL_TIMEOUT)
+        except queue.Empty:
+            raise sqlite3.OperationalError('Timed out waiting for a database connection')
+
+    def release(self, conn):
+        """Return a connection to the pool, discarding any open transaction"""
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; commits on success and rolls back on error"""
+        conn = self.acquire()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        """Close every idle connection"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._created -= 1
+
+def get_pool(readonly=False):
+    """Get the writer or reader pool for the current database"""
+    key = 'reader' if readonly else 'writer'
+    with DB_POOL_LOCK:
+        pool = DB_POOL.get(key)
+        if pool is None or pool.database != DATABASE:
+            logger.info(f"Creating {key} connection pool at: {DATABASE}")
+            if not os.path.exists(DATABASE):
+                logger.error(f"Database file not found at: {DATABASE}")
+                raise FileNotFoundError(f"Database file not found at: {DATABASE}")
+            if pool is not None:
+                pool.close_all()
+            size = DB_READER_POOL_SIZE if readonly else DB_WRITER_POOL_SIZE
+            pool = DB_POOL[key] = ConnectionPool(DATABASE, size, readonly=readonly)
+        return pool
+
 def get_db():
-    """Get database connection from pool or create new one"""
+    """Borrow a writer connection from the pool (use as a context manager)"""
     try:
-        with DB_POOL_LOCK:
-            if 'conn' not in DB_POOL:
-                print(f"Creating new database connection at: {DATABASE}")
-                if not os.path.exists(DATABASE):
-                    print(f"Database file not found at: {DATABASE}")
-                    raise FileNotFoundError(f"Database file not found at: {DATABASE}")
-                
-                conn = sqlite3.connect(DATABASE, check_same_thread=False)
-                conn.row_factory = sqlite3.Row
-                DB_POOL['conn'] = conn
-            return DB_POOL['conn']
+        return get_pool().connection()
+    except sqlite3.Error as e:
+        logger.error(f"Database connection error: {str(e)}")
+        raise
+
+def get_read_db():
+    """Borrow a read-only connection from the pool (use as a context manager)"""
+    try:
+        return get_pool(readonly=True).connection()
     except sqlite3.Error as e:
-        print(f"Database connection error: {str(e)}")
+        logger.error(f"Database connection error: {str(e)}")
         raise
 
 @app.route('/')
@@ -210,114 +685,102 @@ def set_view(set_name):
     return render_template('set.html')
 
 @app.route('/api/stats')
-@enable_cors
+@conditional_get()
 def get_stats():
     """Get overall collection statistics with caching"""
     try:
-        # Check cache first
-        if 'stats' in STATS_CACHE:
-            return jsonify(STATS_CACHE['stats'])
-
-        print("Cache miss - fetching fresh stats")
-        db = get_db()
-        # Ensure all numeric values are properly initialized
-        total_cards = db.execute(
-            'SELECT SUM(quantity + foil_quantity) FROM cards'
-        ).fetchone()[0]
-        unique_cards = db.execute(
-            'SELECT COUNT(*) FROM cards WHERE quantity > 0 OR foil_quantity > 0'
-        ).fetchone()[0]
-        total_possible = db.execute(
-            'SELECT COUNT(*) FROM cards'
-        ).fetchone()[0]
-        total_value = db.execute('''
-            SELECT SUM(
-                quantity * COALESCE(price, 0) + 
-                foil_quantity * COALESCE(foil_price, 0)
-            ) FROM cards
-        ''').fetchone()[0]
-
-        stats = {
-            'total_cards': int(total_cards if total_cards is not None else 0),
-            'unique_cards': int(unique_cards if unique_cards is not None else 0),
-            'total_possible': int(total_possible if total_possible is not None else 0),
-            'total_value': float(total_value if total_value is not None else 0),
-            'by_rarity': {}
-        }
+        # Check cache first; a single locked get so an expiry or clear can't land between check and read.
+        # Entries are tagged with the ETag they were computed under: one filled by a
+        # read that raced a write carries the old ETag and is never served again.
+        with CACHE_LOCK:
+            cached = STATS_CACHE.get('stats')
+        if cached is not None and cached[0] == g.etag:
+            return jsonify(cached[1])
+
+        logger.debug("Cache miss - fetching fresh stats")
+        with get_read_db() as db:
+            # Ensure all numeric values are properly initialized
+            totals = db.execute('''
+                SELECT SUM(total_copies), SUM(owned_cards),
+                       SUM(total_possible), SUM(total_value)
+                FROM set_stats
+            ''').fetchone()
+            total_cards, unique_cards, total_possible, total_value = totals
+
+            stats = {
+                'total_cards': int(total_cards if total_cards is not None else 0),
+                'unique_cards': int(unique_cards if unique_cards is not None else 0),
+                'total_possible': int(total_possible if total_possible is not None else 0),
+                'total_value': float(total_value if total_value is not None else 0),
+                'by_rarity': {}
+            }
         
-        # Get rarity breakdown
-        rarities = db.execute('''
-            SELECT rarity, 
-                   COUNT(*) as total_cards,
-                   SUM(CASE WHEN quantity > 0 OR foil_quantity > 0 THEN 1 ELSE 0 END) as owned_cards,
-                   SUM(quantity + foil_quantity) as total_copies
-            FROM cards 
-            GROUP BY rarity
-        ''')
-        for row in rarities:
-            if row['rarity']:
-                stats['by_rarity'][row['rarity']] = {
-                    'total': row['total_cards'],
-                    'owned': row['owned_cards'],
-                    'copies': row['total_copies']
-                }
+            # Get rarity breakdown
+            rarities = db.execute('''
+                SELECT rarity, 
+                       SUM(total_possible) as total_cards,
+                       SUM(owned_cards) as owned_cards,
+                       SUM(total_copies) as total_copies
+                FROM set_rarity_stats 
+                GROUP BY rarity
+            ''')
+            for row in rarities:
+                if row['rarity']:
+                    stats['by_rarity'][row['rarity']] = {
+                        'total': row['total_cards'],
+                        'owned': row['owned_cards'],
+                        'copies': row['total_copies']
+                    }
         
         # Cache the results
-        STATS_CACHE['stats'] = stats
+        with CACHE_LOCK:
+            STATS_CACHE['stats'] = (g.etag, stats)
         return jsonify(stats)
     except Exception as e:
-        print(f"Error getting stats: {str(e)}")
+        logger.exception(f"Error getting stats: {str(e)}")
         return jsonify({'error': 'Failed to get collection stats'}), 500
 
 @app.route('/api/set/<set_name>/stats')
+@conditional_get(per_set=True)
 def get_set_stats(set_name):
-    """Get set-specific statistics"""
-    with get_db() as db:
-        stats = {
-            'total_cards': db.execute(
-                'SELECT SUM(quantity + foil_quantity) FROM cards WHERE set_name = ?',
-                [set_name]
-            ).fetchone()[0] or 0,
-            'unique_cards': db.execute(
-                'SELECT COUNT(*) FROM cards WHERE set_name = ? AND (quantity > 0 OR foil_quantity > 0)',
-                [set_name]
-            ).fetchone()[0] or 0,
-            'total_possible': db.execute(
-                'SELECT COUNT(*) FROM cards WHERE set_name = ?',
-                [set_name]
-            ).fetchone()[0] or 0,
-            'total_value': db.execute('''
-                SELECT SUM(
-                    quantity * COALESCE(price, 0) + 
-                    foil_quantity * COALESCE(foil_price, 0)
-                ) FROM cards 
-                WHERE set_name = ?
-            ''', [set_name]).fetchone()[0] or 0,
-            'by_rarity': {}
-        }
-        
-        # Get rarity breakdown for set
+    """Get set-specific statistics from a single pass over the set's rarity aggregates"""
+    # Tagged with the set's ETag, like the overall stats cache
+    with CACHE_LOCK:
+        cached = SET_STATS_CACHE.get(set_name)
+    if cached is not None and cached[0] == g.etag:
+        return jsonify(cached[1])
+
+    stats = {
+        'total_cards': 0,
+        'unique_cards': 0,
+        'total_possible': 0,
+        'total_value': 0,
+        'by_rarity': {}
+    }
+    with get_read_db() as db:
         rarities = db.execute('''
-            SELECT rarity, 
-                   COUNT(*) as total_cards,
-                   SUM(CASE WHEN quantity > 0 OR foil_quantity > 0 THEN 1 ELSE 0 END) as owned_cards,
-                   SUM(quantity + foil_quantity) as total_copies
-            FROM cards 
+            SELECT rarity, total_possible, owned_cards, total_copies, total_value
+            FROM set_rarity_stats 
             WHERE set_name = ?
-            GROUP BY rarity
         ''', [set_name])
         for row in rarities:
+            stats['total_cards'] += row['total_copies']
+            stats['unique_cards'] += row['owned_cards']
+            stats['total_possible'] += row['total_possible']
+            stats['total_value'] += row['total_value']
             if row['rarity']:
                 stats['by_rarity'][row['rarity']] = {
-                    'total': row['total_cards'],
+                    'total': row['total_possible'],
                     'owned': row['owned_cards'],
                     'copies': row['total_copies']
                 }
-        
-        return jsonify(stats)
+
+    with CACHE_LOCK:
+        SET_STATS_CACHE[set_name] = (g.etag, stats)
+    return jsonify(stats)
 
 @app.route('/api/sets')
-@enable_cors
+@conditional_get()
 def get_sets():
     """Get list of sets in collection"""
     sort = request.args.get('sort', 'name')  # name, completion, value, cards
@@ -336,46 +799,84 @@ def get_sets():
     sort_sql = sort_clauses.get(sort, 'set_name')
     
     filter_clauses = {
-        'incomplete': 'HAVING owned_cards > 0 AND owned_cards < total_possible',
-        'complete': 'HAVING owned_cards = total_possible',
-        'empty': 'HAVING owned_cards = 0',
+        'incomplete': 'WHERE owned_cards > 0 AND owned_cards < total_possible',
+        'complete': 'WHERE owned_cards = total_possible',
+        'empty': 'WHERE owned_cards = 0',
         'all': ''
     }
     
     filter_sql = filter_clauses.get(filter_type, '')
     
-    with get_db() as db:
+    with get_read_db() as db:
         sets = db.execute(f'''
             SELECT 
                 set_name,
-                COUNT(*) as total_possible,
-                SUM(CASE WHEN quantity > 0 OR foil_quantity > 0 THEN 1 ELSE 0 END) as owned_cards,
-                SUM(quantity + foil_quantity) as total_copies,
-                SUM(
-                    quantity * COALESCE(price, 0) + 
-                    foil_quantity * COALESCE(foil_price, 0)
-                ) as total_value
-            FROM cards 
-            GROUP BY set_name
+                total_possible,
+                owned_cards,
+                total_copies,
+                total_value
+            FROM set_stats 
             {filter_sql}
             ORDER BY {sort_sql} {order_sql}
         ''').fetchall()
         return jsonify([dict(s) for s in sets])
 
+# Columns a client may request through the fields= parameter
+CARD_FIELDS = [
+    'id', 'scryfall_id', 'name', 'set_name', 'collector_number', 'rarity',
+    'quantity', 'foil_quantity', 'price', 'foil_price',
+    'image_normal', 'image_art_crop', 'last_updated'
+]
+CARDS_MAX_LIMIT = 500
+CARDS_DEFAULT_PAGE = 100  # Page size when no limit is given
+
+def encode_cursor(row):
+    """Opaque keyset cursor pointing just past a row"""
+    return f"{row['_sort']}:{row['_id']}"
+
+def decode_cursor(cursor):
+    """Parse a cursor produced by encode_cursor into (collector_sort, id)"""
+    sort_key, card_id = cursor.split(':')
+    return int(sort_key), int(card_id)
+
 @app.route('/api/set/<set_name>/cards')
-@enable_cors
+@conditional_get(per_set=True)
 def get_set_cards(set_name):
-    """Get cards for a specific set with filtering"""
+    """Get cards for a specific set with filtering.
+
+    Cards come back in collector number order, one page at a time (limit
+    cards, CARDS_DEFAULT_PAGE by default). When more remain, the cursor for
+    the next page is sent in the X-Next-Cursor and Link headers. fields=
+    limits the columns returned for each card.
+    """
     search = request.args.get('search', '')
     rarity = request.args.get('rarity', '')
     owned = request.args.get('owned', 'all')
+    cursor = request.args.get('cursor', '')
+    limit = request.args.get('limit', '')
+    fields = [f for f in request.args.get('fields', '').split(',') if f] or CARD_FIELDS
+
+    unknown = [f for f in fields if f not in CARD_FIELDS]
+    if unknown:
+        return jsonify({'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+    try:
+        limit = min(max(int(limit), 1), CARDS_MAX_LIMIT) if limit else CARDS_DEFAULT_PAGE
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        return jsonify({'error': 'Invalid limit or cursor'}), 400
     
-    query = 'SELECT * FROM cards WHERE set_name = ?'
+    columns = ', '.join(fields)
+    query = f'SELECT {columns}, id AS _id, collector_sort AS _sort FROM cards WHERE set_name = ?'
     params = [set_name]
     
     if search:
-        query += ' AND name LIKE ?'
-        params.append(f'%{search}%')
+        match = fts_substring_query(search)
+        if match:
+            query += ' AND id IN (SELECT rowid FROM cards_fts WHERE cards_fts MATCH ?)'
+            params.append(match)
+        else:
+            query += ' AND name LIKE ?'
+            params.append(f'%{search}%')
     if rarity:
         query += ' AND rarity = ?'
         params.append(rarity)
@@ -383,94 +884,494 @@ def get_set_cards(set_name):
         query += ' AND (quantity > 0 OR foil_quantity > 0)'
     elif owned == 'missing':
         query += ' AND quantity = 0 AND foil_quantity = 0'
+    if after:
+        query += ' AND (collector_sort, id) > (?, ?)'
+        params.extend(after)
     
-    query += ' ORDER BY CAST(collector_number AS INTEGER)'
+    # Fetch one extra row to know whether another page exists
+    query += ' ORDER BY collector_sort, id LIMIT ?'
+    params.append(limit + 1)
     
-    with get_db() as db:
+    with get_read_db() as db:
         cards = db.execute(query, params).fetchall()
-        return jsonify([dict(card) for card in cards])
+
+    next_cursor = None
+    if len(cards) > limit:
+        cards = cards[:limit]
+        next_cursor = encode_cursor(cards[-1])
+
+    response = jsonify([{f: card[f] for f in fields} for card in cards])
+    if next_cursor:
+        args = request.args.to_dict()
+        args.update(cursor=next_cursor, limit=limit)
+        response.headers['X-Next-Cursor'] = next_cursor
+        response.headers['Link'] = f'<{url_for("get_set_cards", set_name=set_name, **args)}>; rel="next"'
+    return response
+
+SEARCH_DEFAULT_LIMIT = 50
+SEARCH_MAX_LIMIT = 200
+
+def fts_phrase(text):
+    """Quote text as a single FTS5 phrase"""
+    return '"' + text.replace('"', '""') + '"'
+
+def fts_substring_query(text):
+    """FTS5 query matching names that contain text, or None if it is too short for trigrams"""
+    text = text.strip()
+    if len(text) < 3:
+        return None
+    return fts_phrase(text)
+
+def fts_fuzzy_query(text):
+    """FTS5 query matching names that share any trigram with text, ranked by overlap"""
+    text = text.strip().lower()
+    if len(text) < 3:
+        return None
+    trigrams = sorted({text[i:i + 3] for i in range(len(text) - 2)})
+    return ' OR '.join(fts_phrase(t) for t in trigrams)
+
+def escape_like(text):
+    """Escape LIKE wildcards so text matches literally (with ESCAPE '\\')"""
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+@app.route('/api/search')
+def search_cards():
+    """Search card names across the whole collection.
+
+    Query parameters: q (required), mode (substring, prefix or fuzzy),
+    set (optional set name), limit and offset for paging, and fields= to
+    limit the columns returned for each card.
+    """
+    q = request.args.get('q', '').strip()
+    mode = request.args.get('mode', 'substring')
+    set_name = request.args.get('set', '')
+    fields = [f for f in request.args.get('fields', '').split(',') if f] or CARD_FIELDS
+    try:
+        limit = min(max(int(request.args.get('limit', SEARCH_DEFAULT_LIMIT)), 1), SEARCH_MAX_LIMIT)
+        offset = max(int(request.args.get('offset', 0)), 0)
+    except ValueError:
+        return jsonify({'error': 'limit and offset must be integers'}), 400
+
+    if not q:
+        return jsonify({'error': 'Missing search query'}), 400
+    if mode not in ('substring', 'prefix', 'fuzzy'):
+        return jsonify({'error': f'Unknown search mode: {mode}'}), 400
+    unknown = [f for f in fields if f not in CARD_FIELDS]
+    if unknown:
+        return jsonify({'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+
+    columns = ', '.join(f'cards.{f}' for f in fields)
+
+    match = fts_fuzzy_query(q) if mode == 'fuzzy' else fts_substring_query(q)
+    params = []
+    if match:
+        query = f'''
+            SELECT {columns} FROM cards_fts
+            JOIN cards ON cards.id = cards_fts.rowid
+            WHERE cards_fts MATCH ?
+        '''
+        params.append(match)
+    else:
+        # Too short for the trigram index, fall back to a plain LIKE
+        query = f"SELECT {columns} FROM cards WHERE cards.name LIKE ? ESCAPE '\\'"
+        params.append(escape_like(q) + '%' if mode == 'prefix' else '%' + escape_like(q) + '%')
+
+    if mode == 'prefix' and match:
+        query += " AND cards.name LIKE ? ESCAPE '\\'"
+        params.append(escape_like(q) + '%')
+    if set_name:
+        query += ' AND cards.set_name = ?'
+        params.append(set_name)
+
+    if mode == 'fuzzy' and match:
+        query += ' ORDER BY cards_fts.rank, cards.name'
+    else:
+        query += ' ORDER BY cards.name, cards.set_name'
+    # Fetch one extra row to know whether another page exists
+    query += ' LIMIT ? OFFSET ?'
+    params.extend([limit + 1, offset])
+
+    with get_read_db() as db:
+        cards = db.execute(query, params).fetchall()
+
+    return jsonify({
+        'query': q,
+        'mode': mode,
+        'limit': limit,
+        'offset': offset,
+        'has_more': len(cards) > limit,
+        'results': [dict(card) for card in cards[:limit]]
+    })
+
+def quantity_error(key, value, allow_negative=False):
+    """Error message if value isn't a usable quantity (or delta), else None"""
+    if not isinstance(value, int) or isinstance(value, bool):
+        return f'{key} must be an integer'
+    if not allow_negative and value < 0:
+        return f'{key} cannot be negative'
+    return None
 
 @app.route('/api/card/<scryfall_id>', methods=['PUT'])
 def update_card(scryfall_id):
-    """Update card quantities"""
-    data = request.json
+    """Update card quantities (a missing quantity is set to 0)"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    quantities = [data.get('quantity', 0), data.get('foil_quantity', 0)]
+    for key, value in zip(('quantity', 'foil_quantity'), quantities):
+        error = quantity_error(key, value)
+        if error:
+            return jsonify({'error': error}), 400
+
     with get_db() as db:
-        db.execute('''
+        # Hold the write lock first, so nothing else lands between the signature and our update
+        db.execute('BEGIN IMMEDIATE')
+        before = database_signature()
+        updated = db.execute('''
             UPDATE cards 
             SET quantity = ?,
                 foil_quantity = ?,
                 last_updated = CURRENT_TIMESTAMP
             WHERE scryfall_id = ?
-        ''', [
-            data.get('quantity', 0),
-            data.get('foil_quantity', 0),
-            scryfall_id
-        ])
+            RETURNING set_name
+        ''', quantities + [scryfall_id]).fetchall()
         db.commit()
-        return jsonify({'status': 'success'})
+    invalidate_caches((row['set_name'] for row in updated), before)
+    return jsonify({'status': 'success'})
+
+BATCH_MAX_CHANGES = 5000  # Largest batch accepted by /api/cards/batch
+SQL_MAX_VARIABLES = 500  # Ids per IN (...) lookup
+
+def parse_batch_change(change):
+    """Validate one batch item, returning (kind, quantity, foil_quantity) or an error string.
+
+    Absolute items set quantity/foil_quantity (a missing field is left as
+    is); delta items add quantity_delta/foil_quantity_delta, clamped at zero.
+    """
+    if not isinstance(change, dict) or not isinstance(change.get('scryfall_id'), str):
+        return 'Each change needs a scryfall_id'
+
+    is_delta = 'quantity_delta' in change or 'foil_quantity_delta' in change
+    if is_delta and ('quantity' in change or 'foil_quantity' in change):
+        return 'Cannot mix absolute quantities and deltas in one change'
+
+    keys = ('quantity_delta', 'foil_quantity_delta') if is_delta else ('quantity', 'foil_quantity')
+    values = []
+    for key in keys:
+        value = change.get(key, 0 if is_delta else None)
+        error = quantity_error(key, value, allow_negative=is_delta) if value is not None else None
+        if error:
+            return error
+        values.append(value)
+    if not is_delta and values == [None, None]:
+        return 'Change has no quantities'
+    return ('delta' if is_delta else 'absolute', values[0], values[1])
+
+BATCH_UPDATE_SQL = {
+    'absolute': '''
+        UPDATE cards 
+        SET quantity = COALESCE(?, quantity),
+            foil_quantity = COALESCE(?, foil_quantity),
+            last_updated = CURRENT_TIMESTAMP
+        WHERE scryfall_id = ?
+    ''',
+    'delta': '''
+        UPDATE cards 
+        SET quantity = MAX(quantity + ?, 0),
+            foil_quantity = MAX(foil_quantity + ?, 0),
+            last_updated = CURRENT_TIMESTAMP
+        WHERE scryfall_id = ?
+    ''',
+}
+
+@app.route('/api/cards/batch', methods=['POST'])
+def update_cards_batch():
+    """Apply many quantity changes in one transaction.
+
+    Accepts a JSON list of changes (or {"changes": [...]}) and returns one
+    result per change, in order, with the card's resulting quantities.
+    Changes are applied in request order, so an absolute change after a
+    delta for the same card overrides it. Results report each card's
+    quantities after the whole batch.
+    """
+    data = request.get_json(silent=True)
+    changes = data.get('changes') if isinstance(data, dict) else data
+    if not isinstance(changes, list):
+        return jsonify({'error': 'Expected a list of changes'}), 400
+    if len(changes) > BATCH_MAX_CHANGES:
+        return jsonify({'error': f'At most {BATCH_MAX_CHANGES} changes per batch'}), 413
+
+    parsed = [parse_batch_change(change) for change in changes]
+    ids = {change['scryfall_id'] for change, p in zip(changes, parsed) if not isinstance(p, str)}
 
-def import_collection():
-    """Import collection data"""
-    print("Loading Scryfall data...")
-    with open(SCRYFALL_DATA, 'r', encoding='utf-8') as f:
-        scryfall_cards = {card['id']: card for card in json.load(f)}
-    
-    print("Processing collection...")
     with get_db() as db:
+        # Take the write lock up front so lookups and updates see the same rows
+        db.execute('BEGIN IMMEDIATE')
+        before = database_signature()
+        known = {}
+        id_list = sorted(ids)
+        for i in range(0, len(id_list), SQL_MAX_VARIABLES):
+            chunk = id_list[i:i + SQL_MAX_VARIABLES]
+            rows = db.execute(
+                f"SELECT scryfall_id, set_name FROM cards WHERE scryfall_id IN ({', '.join('?' * len(chunk))})",
+                chunk
+            )
+            known.update((row['scryfall_id'], row['set_name']) for row in rows)
+
+        # Consecutive changes of the same kind go out in one executemany,
+        # which keeps the request order while batching the common cases
+        runs = []
+        for change, p in zip(changes, parsed):
+            if isinstance(p, str) or change['scryfall_id'] not in known:
+                continue
+            kind, quantity, foil_quantity = p
+            if not runs or runs[-1][0] != kind:
+                runs.append((kind, []))
+            runs[-1][1].append((quantity, foil_quantity, change['scryfall_id']))
+
+        for kind, rows in runs:
+            db.executemany(BATCH_UPDATE_SQL[kind], rows)
+
+        updated_ids = sorted({row[2] for _, rows in runs for row in rows})
+        quantities = {}
+        for i in range(0, len(updated_ids), SQL_MAX_VARIABLES):
+            chunk = updated_ids[i:i + SQL_MAX_VARIABLES]
+            rows = db.execute(
+                f"SELECT scryfall_id, quantity, foil_quantity FROM cards WHERE scryfall_id IN ({', '.join('?' * len(chunk))})",
+                chunk
+            )
+            quantities.update((row['scryfall_id'], (row['quantity'], row['foil_quantity'])) for row in rows)
+
+    results = []
+    for change, p in zip(changes, parsed):
+        if isinstance(p, str):
+            results.append({'scryfall_id': change.get('scryfall_id') if isinstance(change, dict) else None,
+                            'status': 'invalid', 'error': p})
+        elif change['scryfall_id'] not in known:
+            results.append({'scryfall_id': change['scryfall_id'], 'status': 'not_found'})
+        else:
+            quantity, foil_quantity = quantities[change['scryfall_id']]
+            results.append({'scryfall_id': change['scryfall_id'], 'status': 'updated',
+                            'quantity': quantity, 'foil_quantity': foil_quantity})
+
+    invalidate_caches({known[scryfall_id] for scryfall_id in updated_ids}, before)
+    return jsonify({
+        'updated': sum(1 for r in results if r['status'] == 'updated'),
+        'results': results
+    })
+
+IMPORT_BATCH_SIZE = 5000  # Rows per executemany call during bulk imports
+
+# PRAGMAs applied to the import connection only. The journal mode is left
+# alone (the database runs in WAL), so if the import process crashes its
+# transaction is rolled back; skipping fsyncs only risks the database if the
+# OS crashes or the machine loses power mid-import.
+BULK_IMPORT_PRAGMAS = {
+    'synchronous': 'OFF',
+    'cache_size': '-200000',  # ~200 MB page cache
+    'temp_store': 'MEMORY',
+}
+
+def card_content_hash(row):
+    """Hash the Scryfall-derived columns of a cards row (everything but the id)"""
+    content = '\x1f'.join(str(value) for value in row[1:])
+    return hashlib.blake2b(content.encode('utf-8'), digest_size=8).hexdigest()
+
+def iter_paper_card_rows(bulk_file):
+    """Yield a cards row for every paper card in a Scryfall bulk file.
+
+    Rows are read from the bulk file's compiled catalog snapshot, which is
+    built on first use and whenever the file changes, so repeated imports
+    and refreshes skip the JSON parse. The last column is the content hash
+    of the other Scryfall-derived values.
+    """
+    catalog = CardCatalog(bulk_file)
+    try:
+        rows = catalog.iter_rows(
+            'id, name, set_name, collector_number, rarity, usd, usd_foil, image_normal, image_art_crop',
+            paper_only=True
+        )
+        for card_id, name, set_name, number, rarity, usd, usd_foil, normal, art_crop in rows:
+            row = (card_id, name, set_name, number, rarity, usd or 0.0, usd_foil or 0.0, normal, art_crop)
+            yield row + (card_content_hash(row),)
+    finally:
+        catalog.close()
+
+def iter_collection_quantities(base_dir='../organized_sets'):  # Updated to use parent directory
+    """Yield (quantity, foil_quantity, scryfall_id) for every row of the collection CSVs"""
+    for batch in load_csv_rows(base_dir, ('scryfall_id', 'Qty', 'Foil')):
+        for scryfall_id, qty, foil in batch.rows:
+            if not scryfall_id:
+                continue
+
+            is_foil = foil.upper() == 'TRUE'
+            yield (
+                int(qty) if not is_foil else 0,
+                int(qty) if is_foil else 0,
+                scryfall_id
+            )
+
+def iter_batches(rows, size=IMPORT_BATCH_SIZE):
+    """Group an iterable of rows into lists of at most `size` rows"""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def open_bulk_connection():
+    """Open a dedicated connection tuned for bulk loading.
+
+    The PRAGMAs only apply to this connection, so closing it is all the
+    cleanup needed.
+    """
+    conn = sqlite3.connect(DATABASE, isolation_level=None, timeout=DB_BUSY_TIMEOUT)
+    for pragma, value in BULK_IMPORT_PRAGMAS.items():
+        try:
+            conn.execute(f'PRAGMA {pragma} = {value}')
+        except sqlite3.OperationalError as e:
+            print(f"Could not set PRAGMA {pragma}: {str(e)}")
+    return conn
+
+def report_rate(label, rows, started):
+    """Print how many rows a bulk step handled and at what rate"""
+    elapsed = max(time.perf_counter() - started, 1e-6)
+    print(f"{label}: {rows} rows in {elapsed:.2f}s ({rows / elapsed:.0f} rows/sec)")
+
+def import_collection(bulk_file=SCRYFALL_DATA):
+    """Import collection data in batched executemany calls inside one transaction"""
+    conn = open_bulk_connection()
+    try:
+        conn.execute('BEGIN')
+        drop_derived_triggers(conn)
+
         # First, add all cards from Scryfall with 0 quantities
-        for card_id, card_data in scryfall_cards.items():
-            if 'games' in card_data and 'paper' in card_data['games']:
-                image_uris = card_data.get('image_uris', {})
-                if not image_uris and 'card_faces' in card_data:
-                    image_uris = card_data['card_faces'][0].get('image_uris', {})
-                
-                db.execute('''
-                    INSERT OR IGNORE INTO cards (
-                        scryfall_id, name, set_name, collector_number,
-                        rarity, quantity, foil_quantity, price, foil_price,
-                        image_normal, image_art_crop
-                    ) VALUES (?, ?, ?, ?, ?, 0, 0, ?, ?, ?, ?)
-                ''', [
-                    card_id,
-                    card_data['name'],
-                    card_data.get('set_name', ''),
-                    card_data.get('collector_number', ''),
-                    card_data.get('rarity', ''),
-                    float(card_data.get('prices', {}).get('usd', 0) or 0),
-                    float(card_data.get('prices', {}).get('usd_foil', 0) or 0),
-                    image_uris.get('normal', ''),
-                    image_uris.get('art_crop', '')
-                ])
-        
-        # Then update quantities from collection CSVs
-        for root, _, files in os.walk('../organized_sets'):  # Updated to use parent directory
-            for file in files:
-                if file.endswith('_with_scryfall.csv'):
-                    filepath = os.path.join(root, file)
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        reader = csv.DictReader(f)
-                        for row in reader:
-                            scryfall_id = row['scryfall_id']
-                            if not scryfall_id or scryfall_id not in scryfall_cards:
-                                continue
-                            
-                            db.execute('''
-                                UPDATE cards 
-                                SET quantity = ?,
-                                    foil_quantity = ?
-                                WHERE scryfall_id = ?
-                            ''', [
-                                int(row['Qty']) if row['Foil'].upper() != 'TRUE' else 0,
-                                int(row['Qty']) if row['Foil'].upper() == 'TRUE' else 0,
-                                scryfall_id
-                            ])
-        db.commit()
+        print("Loading Scryfall data...")
+        started = time.perf_counter()
+        card_rows = 0
+        for batch in iter_batches(iter_paper_card_rows(bulk_file)):
+            conn.executemany('''
+                INSERT OR IGNORE INTO cards (
+                    scryfall_id, name, set_name, collector_number,
+                    rarity, quantity, foil_quantity, price, foil_price,
+                    image_normal, image_art_crop, content_hash
+                ) VALUES (?, ?, ?, ?, ?, 0, 0, ?, ?, ?, ?, ?)
+            ''', batch)
+            card_rows += len(batch)
+        report_rate("Scryfall cards", card_rows, started)
+
+        # Then update quantities from collection CSVs. Unknown ids simply
+        # match no row, so there is no need to keep the Scryfall data around.
+        print("Processing collection...")
+        started = time.perf_counter()
+        quantity_rows = 0
+        for batch in iter_batches(iter_collection_quantities()):
+            conn.executemany('''
+                UPDATE cards 
+                SET quantity = ?,
+                    foil_quantity = ?
+                WHERE scryfall_id = ?
+            ''', batch)
+            quantity_rows += len(batch)
+        report_rate("Collection quantities", quantity_rows, started)
+
+        print("Rebuilding stats and search index...")
+        started = time.perf_counter()
+        rebuild_derived_tables(conn)
+        print(f"Rebuilt derived tables in {time.perf_counter() - started:.2f}s")
+
+        conn.execute('COMMIT')
+        invalidate_all_caches()
+    except Exception:
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
+
+def refresh_collection(bulk_file=SCRYFALL_DATA):
+    """Refresh prices and card metadata from a newer Scryfall bulk file.
+
+    Only rows whose content hash differs from the stored one are written, and
+    quantity/foil_quantity are never touched, so this is safe to run against
+    a live collection.
+    """
+    conn = sqlite3.connect(DATABASE, isolation_level=None, timeout=DB_BUSY_TIMEOUT)
+    try:
+        known_hashes = dict(conn.execute('SELECT scryfall_id, content_hash FROM cards'))
+        print(f"Diffing Scryfall data against {len(known_hashes)} existing cards...")
+
+        started = time.perf_counter()
+        scanned = 0
+        stats = {'new': 0, 'changed': 0}
+
+        def changed_rows():
+            nonlocal scanned
+            for row in iter_paper_card_rows(bulk_file):
+                scanned += 1
+                stored_hash = known_hashes.get(row[0], False)
+                if stored_hash == row[-1]:
+                    continue
+                stats['new' if stored_hash is False else 'changed'] += 1
+                yield row
+
+        conn.execute('BEGIN')
+        for batch in iter_batches(changed_rows()):
+            conn.executemany('''
+                INSERT INTO cards (
+                    scryfall_id, name, set_name, collector_number,
+                    rarity, quantity, foil_quantity, price, foil_price,
+                    image_normal, image_art_crop, content_hash
+                ) VALUES (?, ?, ?, ?, ?, 0, 0, ?, ?, ?, ?, ?)
+                ON CONFLICT(scryfall_id) DO UPDATE SET
+                    name = excluded.name,
+                    set_name = excluded.set_name,
+                    collector_number = excluded.collector_number,
+                    rarity = excluded.rarity,
+                    price = excluded.price,
+                    foil_price = excluded.foil_price,
+                    image_normal = excluded.image_normal,
+                    image_art_crop = excluded.image_art_crop,
+                    content_hash = excluded.content_hash
+            ''', batch)
+        conn.execute('COMMIT')
+        invalidate_all_caches()
+
+        report_rate("Scryfall cards diffed", scanned, started)
+        print(f"Inserted {stats['new']} new cards, updated {stats['changed']} changed cards, "
+              f"{scanned - stats['new'] - stats['changed']} unchanged")
+        return stats
+    except Exception:
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
 
 if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='MTG collection API')
+    parser.add_argument('--import', dest='run_import', action='store_true',
+                        help='Bulk import Scryfall cards and collection CSVs, then exit')
+    parser.add_argument('--refresh', action='store_true',
+                        help='Update prices/metadata of changed cards from the bulk file, then exit')
+    parser.add_argument('--bulk-file', default=SCRYFALL_DATA,
+                        help='Scryfall default-cards bulk file to read')
+    args = parser.parse_args()
+
     print("Initializing database...")
     needs_card_import = init_db()  # This will create or upgrade the database as needed
-    if needs_card_import:
+    if args.run_import:
+        import_collection(args.bulk_file)
+    elif args.refresh:
+        refresh_collection(args.bulk_file)
+    elif needs_card_import:
         print("Database structure created. Ready to receive collection data.")
     else:
         print("Database ready!")
-    app.run(debug=True)
+    if not (args.run_import or args.refresh):
+        app.run(debug=True)
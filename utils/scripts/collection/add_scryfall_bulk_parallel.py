@@ -1,147 +1,426 @@
+import argparse
+import asyncio
 import csv
+import json
+import multiprocessing
 import requests
+import sys
 import time
-from urllib.parse import quote
 import os
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 import threading
 
-# Thread-safe print lock and rate limit semaphore
+# Shared tooling lives in utils/tools at the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'tools'))
+from card_resolver import CardResolver, clean_set_name
+from scryfall_cache import MISSING, ResponseCache, cache_key
+from scryfall_client import get_client
+
+# Thread-safe print lock
 print_lock = threading.Lock()
-rate_limit_semaphore = threading.Semaphore(5)
+
+# Offline index of the Scryfall bulk data; rows it can't resolve fall back
+# to the API unless USE_NETWORK is turned off
+RESOLVER = None
+USE_NETWORK = True
+
+# Persistent cache of API responses, shared across runs
+CACHE = None
+
+# Returned when a lookup failed (network error, 5xx, malformed response), as
+# opposed to None for a card Scryfall doesn't have. Failed rows are retried.
+LOOKUP_FAILED = object()
 
 def safe_print(*args, **kwargs):
     with print_lock:
         print(*args, **kwargs)
 
-def clean_set_name(set_name):
-    """Clean set name for matching with Scryfall data."""
-    return set_name.replace("_", " ").strip()
-
 def get_scryfall_data(name: str, set_name: str, collector_number: str = None) -> dict:
+    """Resolve card data locally, falling back to the Scryfall API for misses.
+
+    Returns None when the card can't be found, LOOKUP_FAILED when the API
+    couldn't be asked.
+    """
+    if RESOLVER is not None:
+        card = RESOLVER.resolve(name, set_name, collector_number)
+        if card:
+            return {
+                "id": card.id,
+                "collector_number": card.collector_number,
+                "set": card.set,
+                "rarity": card.rarity
+            }
+    if not USE_NETWORK:
+        return None
+    return query_scryfall(name, set_name, collector_number)
+
+def lookup_row(row, set_name: str):
+    """get_scryfall_data for one CSV row; an unexpected error fails only that row."""
+    try:
+        return get_scryfall_data(row["Name"], set_name, row.get("Number", ""))
+    except Exception as e:
+        safe_print(f"Error looking up {row['Name']} ({set_name}): {str(e)}")
+        return LOOKUP_FAILED
+
+def search_exact_name(name: str):
+    """Return the printings Scryfall lists for an exact card name (cached on disk).
+
+    An unknown name gives [] (cached too); LOOKUP_FAILED means the request
+    failed and nothing was learned.
+    """
+    key = cache_key("search-exact", name)
+    cached = CACHE.get(key) if CACHE is not None else MISSING
+    if cached is not MISSING:
+        return cached
+
+    try:
+        # The shared client paces requests and retries 429s with backoff
+        response = get_client().get("/cards/search", params={"q": f'!"{name}"'})
+    except requests.RequestException as e:
+        safe_print(f"Error getting data for {name}: {str(e)}")
+        return LOOKUP_FAILED
+
+    if response.status_code == 200:
+        printings = [
+            {
+                "id": card["id"],
+                "set_name": card["set_name"],
+                "collector_number": card["collector_number"],
+                "set": card["set"],
+                "rarity": card["rarity"]
+            }
+            for card in response.json()["data"]
+        ]
+    elif response.status_code == 404:
+        printings = []  # No such card; worth remembering too
+    else:
+        safe_print(f"Error getting data for {name}: HTTP {response.status_code}")
+        return LOOKUP_FAILED
+
+    if CACHE is not None:
+        CACHE.set(key, printings)
+    return printings
+
+def query_scryfall(name: str, set_name: str, collector_number: str = None) -> dict:
     """Query Scryfall API to get card data."""
-    with rate_limit_semaphore:
-        try:
-            # Rate limiting - Scryfall asks for 50-100ms between requests
-            time.sleep(0.1)
-            
-            # Encode the card name for the URL
-            encoded_name = quote(f'!"{name}"')
-            url = f"https://api.scryfall.com/cards/search?q={encoded_name}"
-            response = requests.get(url)
+    printings = search_exact_name(name)
+    if printings is LOOKUP_FAILED:
+        return LOOKUP_FAILED
+    if not printings:
+        return None
+
+    # Clean the set name for comparison
+    clean_name = clean_set_name(set_name)
+    
+    # Try to find exact match in the returned cards
+    for card in printings:
+        # Compare set names
+        if clean_name.lower() in card["set_name"].lower():
+            # If we have a collector number, verify it matches
+            if collector_number and str(card["collector_number"]) != str(collector_number):
+                continue
             
-            # Handle rate limiting
-            if response.status_code == 429:  # Too Many Requests
-                time.sleep(1)
-                return get_scryfall_data(name, set_name, collector_number)
-                
-            if response.status_code == 200:
-                data = response.json()
-                if data["total_cards"] > 0:
-                    # Clean the set name for comparison
-                    clean_name = clean_set_name(set_name)
-                    
-                    # Try to find exact match in the returned cards
-                    for card in data["data"]:
-                        # Compare set names
-                        if clean_name.lower() in card["set_name"].lower():
-                            # If we have a collector number, verify it matches
-                            if collector_number and str(card["collector_number"]) != str(collector_number):
-                                continue
-                            
-                            return {
-                                "id": card["id"],
-                                "collector_number": card["collector_number"],
-                                "set": card["set"],
-                                "rarity": card["rarity"]
-                            }
-                    
-                    # If no exact set match found, use the first result
-                    card_data = data["data"][0]
-                    return {
-                        "id": card_data["id"],
-                        "collector_number": card_data["collector_number"],
-                        "set": card_data["set"],
-                        "rarity": card_data["rarity"]
-                    }
-                    
-            return None
-        except Exception as e:
-            if "rate limit" in str(e).lower():
-                time.sleep(1)
-                return get_scryfall_data(name, set_name, collector_number)
-            safe_print(f"Error getting data for {name}: {str(e)}")
+            return {
+                "id": card["id"],
+                "collector_number": card["collector_number"],
+                "set": card["set"],
+                "rarity": card["rarity"]
+            }
+    
+    # If no exact set match found, use the first result
+    card_data = printings[0]
+    return {
+        "id": card_data["id"],
+        "collector_number": card_data["collector_number"],
+        "set": card_data["set"],
+        "rarity": card_data["rarity"]
+    }
+
+SCRYFALL_COLUMNS = ["scryfall_id", "collector_number", "scryfall_set", "scryfall_rarity"]
+
+def output_path(input_file):
+    return str(input_file).replace(".csv", "_with_scryfall.csv")
+
+def is_completed(input_file):
+    """A set is done once its output exists and no journal is left behind.
+
+    Sets written with failed lookups keep their journal, so they count as
+    unfinished and a rerun retries just those rows.
+    """
+    return os.path.exists(output_path(input_file)) and not os.path.exists(Journal(input_file).path)
+
+class Journal:
+    """Append-only log of resolved rows for one set file.
+
+    Every resolved row (a match, or a card Scryfall doesn't have) is written
+    as a JSON line as soon as it is known, so an interrupted run can pick up
+    where it stopped. Failed lookups are never written. The first line records the
+    input file's size and mtime; a journal for a file that has since changed
+    is discarded.
+    """
+
+    def __init__(self, input_file):
+        self.input_file = input_file
+        self.path = output_path(input_file) + ".journal"
+        self._file = None
+
+    def _fingerprint(self):
+        stat = os.stat(self.input_file)
+        return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+    def load(self) -> dict:
+        """Return {row index: card data or None} for rows resolved by earlier runs."""
+        resolved = {}
+        if not os.path.exists(self.path):
+            return resolved
+        with open(self.path, "r", encoding="utf-8") as f:
+            lines = iter(f)
+            header = next(lines, None)
+            if header is None or json.loads(header) != self._fingerprint():
+                safe_print(f"Discarding stale journal for {self.input_file}")
+                os.remove(self.path)
+                return resolved
+            truncated = False
+            for line in lines:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    truncated = True  # Partial last line from an interrupted write
+                    break
+                resolved[entry["row"]] = entry["card"]
+        if truncated:
+            # Rewrite without the partial line so new entries start on a clean line
+            with open(self.path, "w", encoding="utf-8") as f:
+                f.write(header)
+                for index, card_data in resolved.items():
+                    f.write(json.dumps({"row": index, "card": card_data}) + "\n")
+        return resolved
+
+    def _open(self):
+        if self._file is None:
+            is_new = not os.path.exists(self.path)
+            self._file = open(self.path, "a", encoding="utf-8", buffering=1)  # Line buffered
+            if is_new:
+                self._file.write(json.dumps(self._fingerprint()) + "\n")
+        return self._file
+
+    def record(self, index, card_data):
+        self._open().write(json.dumps({"row": index, "card": card_data}) + "\n")
+
+    def keep(self):
+        """Make sure the journal exists (even with nothing resolved) so the set stays unfinished."""
+        self._open()
+        self.close()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+def read_set_file(input_file):
+    """Read a set CSV, returning (headers, rows) or None if it isn't a card file."""
+    with open(input_file, "r", encoding="utf-8") as infile:
+        reader = csv.DictReader(infile)
+        if not reader.fieldnames or "Name" not in reader.fieldnames:
+            safe_print(f"Skipping {input_file} - not a card file")
             return None
+        return reader.fieldnames + SCRYFALL_COLUMNS, list(reader)
+
+def apply_card_data(row, card_data):
+    """Fill the Scryfall columns of a row from a lookup result (or blank them)."""
+    row["scryfall_id"] = card_data["id"] if card_data else ""
+    row["collector_number"] = card_data["collector_number"] if card_data else ""
+    row["scryfall_set"] = card_data["set"] if card_data else ""
+    row["scryfall_rarity"] = card_data["rarity"] if card_data else ""
+
+def write_set_file(input_file, headers, rows, failed=0):
+    """Write the enriched rows next to the input file and report the results.
+
+    The journal is dropped once every row is resolved; with failed lookups
+    it is kept so the next run retries only those rows.
+    """
+    set_name = Path(input_file).stem
+    output_file = output_path(input_file)
+    temp_file = output_file + ".tmp"
+    with open(temp_file, "w", encoding="utf-8", newline="") as outfile:
+        writer = csv.DictWriter(outfile, fieldnames=headers)
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(temp_file, output_file)
+    if failed:
+        Journal(input_file).keep()
+    else:
+        Journal(input_file).remove()
+    
+    total_cards = len(rows)
+    matched_cards = sum(1 for row in rows if row["scryfall_id"])
+    safe_print(f"\nResults for {set_name}:")
+    safe_print(f"Total cards processed: {total_cards}")
+    safe_print(f"Successfully matched: {matched_cards}")
+    safe_print(f"Failed to match: {total_cards - matched_cards}")
+    if failed:
+        safe_print(f"Lookups failed: {failed} (retried on the next run)")
+    if total_cards:
+        safe_print(f"Success rate: {(matched_cards/total_cards)*100:.2f}%")
+    safe_print(f"Output saved to: {output_file}")
+    
+    return {
+        "set_name": set_name,
+        "total": total_cards,
+        "matched": matched_cards,
+        "failed": failed
+    }
 
 def process_set_file(input_file):
+    """Enrich one set file serially (used by the multi-process offline mode)."""
     safe_print(f"\nProcessing {input_file}...")
-    
     set_name = Path(input_file).stem
-    safe_print(f"Processing set: {set_name}")
-    
-    output_file = str(input_file).replace(".csv", "_with_scryfall.csv")
     
+    journal = Journal(input_file)
     try:
-        with open(input_file, "r", encoding="utf-8") as infile:
-            reader = csv.DictReader(infile)
-            
-            if "Name" not in reader.fieldnames:
-                safe_print(f"Skipping {input_file} - not a card file")
-                return
-                
-            headers = reader.fieldnames + ["scryfall_id", "collector_number", "scryfall_set", "scryfall_rarity"]
-            
-            rows = []
-            total_cards = 0
-            matched_cards = 0
-            
-            for row in reader:
-                total_cards += 1
-                # Try to get collector number from the row
-                collector_number = row.get("Number", "")
-                card_data = get_scryfall_data(row["Name"], set_name, collector_number)
-                
-                if card_data:
-                    matched_cards += 1
-                    row["scryfall_id"] = card_data["id"]
-                    row["collector_number"] = card_data["collector_number"]
-                    row["scryfall_set"] = card_data["set"]
-                    row["scryfall_rarity"] = card_data["rarity"]
-                else:
-                    row["scryfall_id"] = ""
-                    row["collector_number"] = ""
-                    row["scryfall_set"] = ""
-                    row["scryfall_rarity"] = ""
-                
-                rows.append(row)
-                
-                if total_cards % 10 == 0:
-                    safe_print(f"{set_name}: Processed {total_cards} cards. Successfully matched: {matched_cards}")
-            
-            with open(output_file, "w", encoding="utf-8", newline="") as outfile:
-                writer = csv.DictWriter(outfile, fieldnames=headers)
-                writer.writeheader()
-                writer.writerows(rows)
+        loaded = read_set_file(input_file)
+        if loaded is None:
+            return None
+        headers, rows = loaded
+        resolved = journal.load()
+        failed = 0
+        
+        for index, row in enumerate(rows):
+            if index in resolved:
+                apply_card_data(row, resolved[index])
+                continue
+            card_data = lookup_row(row, set_name)
+            if card_data is LOOKUP_FAILED:
+                apply_card_data(row, None)
+                failed += 1
+            else:
+                apply_card_data(row, card_data)
+                journal.record(index, card_data)
             
-            safe_print(f"\nResults for {set_name}:")
-            safe_print(f"Total cards processed: {total_cards}")
-            safe_print(f"Successfully matched: {matched_cards}")
-            safe_print(f"Failed to match: {total_cards - matched_cards}")
-            safe_print(f"Success rate: {(matched_cards/total_cards)*100:.2f}%")
-            safe_print(f"Output saved to: {output_file}")
-            
-            return {
-                "set_name": set_name,
-                "total": total_cards,
-                "matched": matched_cards
-            }
+            if (index + 1) % 10 == 0:
+                safe_print(f"{set_name}: Processed {index + 1} cards")
+        
+        journal.close()
+        return write_set_file(input_file, headers, rows, failed)
             
     except Exception as e:
         safe_print(f"Error processing {input_file}: {str(e)}")
         return None
+    finally:
+        journal.close()
+
+class SetJob:
+    """Rows of one set file moving through the async pipeline."""
+
+    def __init__(self, input_file, headers, rows):
+        self.input_file = input_file
+        self.set_name = Path(input_file).stem
+        self.headers = headers
+        self.rows = rows
+        self.journal = Journal(input_file)
+
+        # Rows resolved by an interrupted earlier run are filled in up front
+        resolved = self.journal.load()
+        for index, card_data in resolved.items():
+            if index < len(rows):
+                apply_card_data(rows[index], card_data)
+        self.pending = [i for i in range(len(rows)) if i not in resolved]
+        self.remaining = len(self.pending)
+        self.failed = 0
+        if resolved:
+            safe_print(f"{self.set_name}: resuming with {len(rows) - self.remaining} of {len(rows)} rows already resolved")
+
+def interleave_rows(jobs):
+    """Yield (job, index) round-robin across jobs so small sets aren't stuck behind large ones."""
+    iterators = [(job, iter(job.pending)) for job in jobs]
+    while iterators:
+        still_active = []
+        for job, pending in iterators:
+            index = next(pending, None)
+            if index is not None:
+                yield job, index
+                still_active.append((job, pending))
+        iterators = still_active
 
-def process_all_sets():
+async def enrich_sets_async(set_files, workers: int = 16):
+    """Enrich every set file through one shared pool of row lookups.
+
+    Rows from all files are fed round-robin to `workers` concurrent lookups.
+    Lookups run in threads; network ones are paced by the shared client's
+    global rate limit, so throughput tracks that limit rather than the size
+    of individual sets. Each set is written as soon as its last row resolves.
+    """
+    loop = asyncio.get_running_loop()
+    lookup_pool = ThreadPoolExecutor(max_workers=workers)
+    results = []
+
+    jobs = []
+    for input_file in set_files:
+        try:
+            loaded = read_set_file(input_file)
+        except Exception as e:
+            safe_print(f"Error processing {input_file}: {str(e)}")
+            continue
+        if loaded is not None:
+            jobs.append(SetJob(input_file, *loaded))
+    for job in jobs:
+        if job.remaining == 0:
+            results.append(await loop.run_in_executor(None, write_set_file, job.input_file, job.headers, job.rows))
+
+    queue = asyncio.Queue(maxsize=workers * 2)
+
+    async def produce():
+        for item in interleave_rows(jobs):
+            await queue.put(item)
+        for _ in range(workers):
+            await queue.put(None)
+
+    async def finish(job):
+        try:
+            job.journal.close()
+            result = await loop.run_in_executor(
+                None, write_set_file, job.input_file, job.headers, job.rows, job.failed)
+            results.append(result)
+        except Exception as e:
+            safe_print(f"Error writing {job.input_file}: {str(e)}")
+
+    async def work():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            job, index = item
+            row = job.rows[index]
+            card_data = await loop.run_in_executor(lookup_pool, lookup_row, row, job.set_name)
+
+            if card_data is LOOKUP_FAILED:
+                apply_card_data(row, None)
+                job.failed += 1
+            else:
+                apply_card_data(row, card_data)
+                job.journal.record(index, card_data)
+            job.remaining -= 1
+            done = len(job.pending) - job.remaining
+            if done % 10 == 0:
+                safe_print(f"{job.set_name}: Processed {done} of {len(job.pending)} remaining cards")
+            if job.remaining == 0:
+                await finish(job)
+
+    try:
+        await asyncio.gather(produce(), *(work() for _ in range(workers)))
+    finally:
+        lookup_pool.shutdown(wait=False)
+        for job in jobs:
+            job.journal.close()
+    return results
+
+def process_all_sets(processes: int = 0, workers: int = 16, force: bool = False):
     base_dir = "organized_sets"
     skip_files = ["sets_summary.csv", "type_summary.csv"]
     set_files = []
@@ -155,25 +434,40 @@ def process_all_sets():
         if folder_name in target_folders:
             for file in files:
                 if file.endswith(".csv") and not file.endswith("_with_scryfall.csv") and file not in skip_files:
-                    # Only process files that come after "Portal" alphabetically
-                    if file >= "Portal.csv":
-                        set_files.append(os.path.join(root, file))
+                    set_files.append(os.path.join(root, file))
     
     # Sort files to ensure we process them in order
     set_files.sort()
     
+    # Files finished by an earlier run are skipped; interrupted ones resume from their journal
+    if not force:
+        completed = [f for f in set_files if is_completed(f)]
+        if completed:
+            safe_print(f"Skipping {len(completed)} set files already completed by an earlier run")
+        set_files = [f for f in set_files if f not in set(completed)]
+    else:
+        for f in set_files:
+            Journal(f).remove()
+    
+    started = time.time()
     results = []
-    # Process sets in parallel using ThreadPoolExecutor
-    with ThreadPoolExecutor(max_workers=3) as executor:  # Using 3 workers for better rate limiting
-        future_to_file = {executor.submit(process_set_file, file): file for file in set_files}
-        for future in as_completed(future_to_file):
-            file = future_to_file[future]
-            try:
-                result = future.result()
-                if result:
-                    results.append(result)
-            except Exception as e:
-                safe_print(f"Error processing {file}: {str(e)}")
+    if processes > 1 and not USE_NETWORK:
+        # Fully offline runs are CPU-bound, so spread files across processes.
+        # Forked workers open their own connection to the resolver's catalog snapshot.
+        executor = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("fork"))
+        with executor:
+            future_to_file = {executor.submit(process_set_file, file): file for file in set_files}
+            for future in as_completed(future_to_file):
+                file = future_to_file[future]
+                try:
+                    result = future.result()
+                    if result:
+                        results.append(result)
+                except Exception as e:
+                    safe_print(f"Error processing {file}: {str(e)}")
+    else:
+        results = asyncio.run(enrich_sets_async(set_files, workers))
+    elapsed = time.time() - started
     
     # Print final summary
     safe_print("\nFinal Summary:")
@@ -183,11 +477,43 @@ def process_all_sets():
         safe_print(f"Total sets processed: {len(results)}")
         safe_print(f"Total cards processed: {total_cards}")
         safe_print(f"Total cards matched: {total_matched}")
-        safe_print(f"Overall success rate: {(total_matched/total_cards)*100:.2f}%")
+        total_failed = sum(r["failed"] for r in results)
+        if total_failed:
+            safe_print(f"Failed lookups: {total_failed} in {sum(1 for r in results if r['failed'])} sets; "
+                       f"run again to retry them")
+        if total_cards:
+            safe_print(f"Overall success rate: {(total_matched/total_cards)*100:.2f}%")
+        safe_print(f"Throughput: {total_cards / max(elapsed, 1e-6):.1f} cards/s")
     else:
         safe_print("No sets were processed")
 
+    if CACHE is not None:
+        stats = CACHE.stats()
+        safe_print(f"Scryfall cache: {stats['hits']} hits, {stats['misses']} misses, "
+                   f"{stats['entries']} entries stored")
+
 if __name__ == "__main__":
-    print("Starting to add Scryfall IDs to standard and supplemental sets from Portal onwards...")
-    process_all_sets()
+    parser = argparse.ArgumentParser(description="Add Scryfall IDs to collection CSVs")
+    parser.add_argument("--bulk-file", help="Scryfall default-cards bulk file used to resolve rows offline")
+    parser.add_argument("--offline", action="store_true",
+                        help="Never query the Scryfall API; unresolved rows are left blank")
+    parser.add_argument("--processes", type=int, default=0,
+                        help="Worker processes for --offline runs (default: threads)")
+    parser.add_argument("--no-cache", action="store_true", help="Don't use the on-disk response cache")
+    parser.add_argument("--workers", type=int, default=16,
+                        help="Concurrent row lookups in the async pipeline (default: 16)")
+    parser.add_argument("--force", action="store_true",
+                        help="Reprocess set files that already have output, ignoring journals")
+    args = parser.parse_args()
+
+    if args.offline and not args.bulk_file:
+        parser.error("--offline requires --bulk-file")
+    if args.bulk_file:
+        RESOLVER = CardResolver.from_bulk_file(args.bulk_file)
+    USE_NETWORK = not args.offline
+    if USE_NETWORK and not args.no_cache:
+        CACHE = ResponseCache()
+
+    print("Starting to add Scryfall IDs to standard and supplemental sets...")
+    process_all_sets(args.processes, args.workers, args.force)
     print("\nProcess complete!")
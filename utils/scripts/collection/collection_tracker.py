@@ -1,205 +1,357 @@
 import json
 import csv
+import io
 import os
+import sys
+import time
 from datetime import datetime
-from typing import Dict, List, Set
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'tools'))
+from card_catalog import CardCatalog
+from csv_loader import load_csv_rows
+
+SCRYFALL_DATA = 'default-cards-20241216100811.json'
+CSV_FIELDNAMES = ['Name', 'Set', 'Qty', 'Foil', 'scryfall_id',
+                  'collector_number', 'scryfall_set', 'scryfall_rarity']
+RARITIES = ('common', 'uncommon', 'rare', 'mythic')  # Rarities broken out in the stats; others get code len(RARITIES)
+
+def card_entry(card_name: str, set_name: str, quantity: int = 1, foil: bool = False) -> tuple:
+    """Fill in defaults for a batch add/remove entry"""
+    return card_name, set_name, quantity, foil
+
+def set_type_for(set_name: str) -> str:
+    """Folder under organized_sets for a set (commander, core, masters, etc)"""
+    set_lower = set_name.lower()
+    if 'commander' in set_lower:
+        return 'commander'
+    elif any(x in set_lower for x in ['masters', 'horizons']):
+        return 'masters'
+    elif 'core' in set_lower or 'edition' in set_lower:
+        return 'core'
+    elif any(x in set_lower for x in ['secret lair', 'universes', 'doctor who']):
+        return 'special'
+    elif 'promo' in set_lower or 'buy-a-box' in set_lower:
+        return 'promo'
+    return 'standard'
+
+def write_if_changed(filepath: str, content: str) -> bool:
+    """Atomically replace a file with content, unless it already holds exactly that"""
+    try:
+        with open(filepath, 'r', newline='', encoding='utf-8') as f:
+            if f.read() == content:
+                return False
+    except FileNotFoundError:
+        pass
+
+    temp_path = filepath + '.tmp'
+    with open(temp_path, 'w', newline='', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(temp_path, filepath)
+    return True
+
+class CollectionArrays:
+    """Owned copies as parallel NumPy columns, one entry per copy.
+
+    Sets and rarities are stored as integer codes into `set_names` and
+    RARITIES; `price` is the copy's USD price (foil or not), NaN when
+    unknown.
+    """
+
+    def __init__(self, card_ids, set_names, quantity, foil, rarity, set_index, price):
+        self.card_ids = card_ids
+        self.set_names = set_names
+        self.quantity = quantity
+        self.foil = foil
+        self.rarity = rarity
+        self.set_index = set_index
+        self.price = price
 
 class CollectionTracker:
-    def __init__(self):
-        self.scryfall_cards: Dict[str, dict] = {}  # id -> card data
+    def __init__(self, scryfall_file: str = SCRYFALL_DATA):
+        self.scryfall_file = scryfall_file
+        self.scryfall_cards: Optional[CardCatalog] = None  # id -> card data, backed by the compiled snapshot
         self.collection: Dict[str, List[dict]] = {}  # id -> list of owned copies
+        self._arrays: Optional[CollectionArrays] = None  # Columnar view of collection, rebuilt after changes
+        self.set_files: Dict[str, str] = {}  # set name -> CSV it was loaded from or saved to
+        self.dirty_sets: Set[str] = set()  # sets changed since the last load or save
         self.load_scryfall_data()
         self.load_collection()
 
     def load_scryfall_data(self):
-        """Load Scryfall default cards data"""
+        """Open the compiled Scryfall catalog, compiling it first if the bulk file changed"""
         print("Loading Scryfall data...")
-        with open('default-cards-20241216100811.json', 'r', encoding='utf-8') as f:
-            cards = json.load(f)
-            for card in cards:
-                self.scryfall_cards[card['id']] = card
-        print(f"Loaded {len(self.scryfall_cards)} cards from Scryfall")
+        started = time.time()
+        self.scryfall_cards = CardCatalog(self.scryfall_file)
+        print(f"Opened catalog of {len(self.scryfall_cards)} cards in {time.time() - started:.2f}s")
+
+    def find_card_id(self, card_name: str, set_name: str) -> Optional[str]:
+        """Scryfall id of a card by exact name and set name (case-insensitive)"""
+        return self.scryfall_cards.find(card_name, set_name)
+
+    def find_card_by_number(self, set_code: str, collector_number: str) -> Optional[str]:
+        """Scryfall id of a printing by set code and collector number"""
+        return self.scryfall_cards.find_by_number(set_code, collector_number)
 
     def load_collection(self):
         """Load collection data from CSV files"""
         print("Loading collection data...")
         collection_count = 0
+        self._arrays = None
+        self.dirty_sets.clear()
         
-        # Walk through organized_sets directory
-        for root, _, files in os.walk('organized_sets'):
-            for file in files:
-                if file.endswith('_with_scryfall.csv'):
-                    filepath = os.path.join(root, file)
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        reader = csv.DictReader(f)
-                        for row in reader:
-                            scryfall_id = row['scryfall_id']
-                            if not scryfall_id:
-                                continue
-                                
-                            if scryfall_id not in self.collection:
-                                self.collection[scryfall_id] = []
-                            
-                            # Add this copy to collection
-                            self.collection[scryfall_id].append({
-                                'set': row['Set'],
-                                'quantity': int(row['Qty']),
-                                'foil': row['Foil'].upper() == 'TRUE',
-                                'collector_number': row['collector_number']
-                            })
-                            collection_count += int(row['Qty'])
+        # Files are parsed in parallel; unchanged ones come from the loader's cache
+        columns = ('scryfall_id', 'Set', 'Qty', 'Foil', 'collector_number')
+        for batch in load_csv_rows('organized_sets', columns):
+            for scryfall_id, set_name, qty, foil, collector_number in batch.rows:
+                if not scryfall_id:
+                    continue
+
+                # Saves go back to the file a set was loaded from
+                self.set_files.setdefault(set_name, batch.path)
+
+                # Add this copy to collection
+                self.collection.setdefault(scryfall_id, []).append({
+                    'set': set_name,
+                    'quantity': int(qty),
+                    'foil': foil.upper() == 'TRUE',
+                    'collector_number': collector_number
+                })
+                collection_count += int(qty)
 
         print(f"Loaded {collection_count} cards across {len(self.collection)} unique cards")
 
-    def get_collection_stats(self) -> dict:
-        """Get statistics about the collection"""
-        stats = {
-            'total_cards': 0,
-            'unique_cards': len(self.collection),
-            'foil_cards': 0,
-            'by_rarity': {'common': 0, 'uncommon': 0, 'rare': 0, 'mythic': 0},
-            'by_set': {},
-            'estimated_value': 0.0
-        }
+    def collection_arrays(self) -> CollectionArrays:
+        """Columnar view of every owned copy with catalog data, cached until the collection changes"""
+        if self._arrays is not None:
+            return self._arrays
 
+        rarity_codes = {rarity: code for code, rarity in enumerate(RARITIES)}
+        set_codes: Dict[str, int] = {}
+        card_ids, quantity, foil, rarity, set_index, price = [], [], [], [], [], []
         for card_id, copies in self.collection.items():
             card_data = self.scryfall_cards.get(card_id)
             if not card_data:
                 continue
-
             for copy in copies:
-                qty = copy['quantity']
-                stats['total_cards'] += qty
-                
-                if copy['foil']:
-                    stats['foil_cards'] += qty
+                card_ids.append(card_id)
+                quantity.append(copy['quantity'])
+                foil.append(copy['foil'])
+                rarity.append(rarity_codes.get(card_data.rarity, len(RARITIES)))
+                set_index.append(set_codes.setdefault(copy['set'], len(set_codes)))
+                copy_price = card_data.price(copy['foil'])
+                price.append(copy_price if copy_price is not None else np.nan)
 
-                # Track by set
-                set_name = copy['set']
-                if set_name not in stats['by_set']:
-                    stats['by_set'][set_name] = 0
-                stats['by_set'][set_name] += qty
+        self._arrays = CollectionArrays(
+            card_ids,
+            list(set_codes),
+            np.array(quantity, dtype=np.int64),
+            np.array(foil, dtype=bool),
+            np.array(rarity, dtype=np.int8),
+            np.array(set_index, dtype=np.int32),
+            np.array(price, dtype=np.float64),
+        )
+        return self._arrays
+
+    def get_collection_stats(self) -> dict:
+        """Get statistics about the collection"""
+        arrays = self.collection_arrays()
+        qty = arrays.quantity
+
+        by_rarity = np.bincount(arrays.rarity, weights=qty, minlength=len(RARITIES) + 1)
+        by_set = np.bincount(arrays.set_index, weights=qty, minlength=len(arrays.set_names))
+        return {
+            'total_cards': int(qty.sum()),
+            'unique_cards': len(self.collection),
+            'foil_cards': int(qty[arrays.foil].sum()),
+            'by_rarity': {rarity: int(by_rarity[code]) for code, rarity in enumerate(RARITIES)},
+            'by_set': {set_name: int(by_set[code]) for code, set_name in enumerate(arrays.set_names)},
+            'estimated_value': float(np.nansum(arrays.price * qty))
+        }
 
-                # Track by rarity
-                rarity = card_data.get('rarity', 'unknown')
-                if rarity in stats['by_rarity']:
-                    stats['by_rarity'][rarity] += qty
+    def to_dataframe(self):
+        """The owned copies as a pandas DataFrame for ad-hoc analysis (requires pandas)"""
+        try:
+            import pandas as pd
+        except ImportError:
+            raise ImportError("to_dataframe requires pandas: pip install pandas") from None
 
-                # Add value if available
-                if 'prices' in card_data:
-                    price_key = 'usd_foil' if copy['foil'] else 'usd'
-                    if card_data['prices'].get(price_key):
-                        stats['estimated_value'] += float(card_data['prices'][price_key]) * qty
+        arrays = self.collection_arrays()
+        rarities = np.array(RARITIES + ('other',))
+        return pd.DataFrame({
+            'scryfall_id': arrays.card_ids,
+            'set': pd.Categorical.from_codes(arrays.set_index, arrays.set_names),
+            'rarity': pd.Categorical(rarities[arrays.rarity], categories=rarities),
+            'quantity': arrays.quantity,
+            'foil': arrays.foil,
+            'price': arrays.price,
+        })
 
-        return stats
+    def to_arrow(self):
+        """The owned copies as a pyarrow Table (requires pyarrow)"""
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError("to_arrow requires pyarrow: pip install pyarrow") from None
+
+        arrays = self.collection_arrays()
+        return pa.table({
+            'scryfall_id': arrays.card_ids,
+            'set': pa.DictionaryArray.from_arrays(arrays.set_index, arrays.set_names),
+            'rarity': pa.DictionaryArray.from_arrays(arrays.rarity, list(RARITIES) + ['other']),
+            'quantity': arrays.quantity,
+            'foil': arrays.foil,
+            'price': pa.array(arrays.price, from_pandas=True),
+        })
 
     def add_card(self, card_name: str, set_name: str, quantity: int = 1, foil: bool = False) -> bool:
         """Add a card to the collection"""
-        # Find card in Scryfall data
-        card_data = None
-        card_id = None
-        
-        for id, data in self.scryfall_cards.items():
-            if data['name'] == card_name and data.get('set_name', '').lower() == set_name.lower():
-                card_data = data
-                card_id = id
-                break
-
-        if not card_data:
+        card_id = self.find_card_id(card_name, set_name)
+        if card_id is None:
             print(f"Could not find card: {card_name} from set: {set_name}")
             return False
 
-        # Add to collection
-        if card_id not in self.collection:
-            self.collection[card_id] = []
+        self._add_copy(card_id, set_name, quantity, foil)
+        return True
+
+    def _add_copy(self, card_id: str, set_name: str, quantity: int, foil: bool):
+        self._arrays = None
+        self.dirty_sets.add(set_name)
+        copies = self.collection.setdefault(card_id, [])
 
         # Check if we already have this exact version
-        for copy in self.collection[card_id]:
+        for copy in copies:
             if copy['set'] == set_name and copy['foil'] == foil:
                 copy['quantity'] += quantity
                 break
         else:
             # Add new copy
-            self.collection[card_id].append({
+            copies.append({
                 'set': set_name,
                 'quantity': quantity,
                 'foil': foil,
-                'collector_number': card_data.get('collector_number', '')
+                'collector_number': self.scryfall_cards[card_id].collector_number
             })
 
-        return True
-
     def remove_card(self, card_name: str, set_name: str, quantity: int = 1, foil: bool = False) -> bool:
         """Remove a card from the collection"""
-        # Find card in collection
-        for card_id, copies in self.collection.items():
-            card_data = self.scryfall_cards[card_id]
-            if card_data['name'] == card_name:
-                for copy in copies:
-                    if copy['set'] == set_name and copy['foil'] == foil:
-                        if copy['quantity'] <= quantity:
-                            copies.remove(copy)
-                            if not copies:
-                                del self.collection[card_id]
-                        else:
-                            copy['quantity'] -= quantity
-                        return True
-        
+        if self._remove_copy(card_name, set_name, quantity, foil):
+            return True
+
         print(f"Could not find card to remove: {card_name} from set: {set_name}")
         return False
 
-    def save_collection(self):
-        """Save collection back to CSV files"""
+    def _remove_copy(self, card_name: str, set_name: str, quantity: int, foil: bool) -> bool:
+        # Only the printings sharing this name can hold the copy
+        for card_id in self.scryfall_cards.ids_by_name(card_name):
+            copies = self.collection.get(card_id)
+            if not copies:
+                continue
+            for copy in copies:
+                if copy['set'] == set_name and copy['foil'] == foil:
+                    self._arrays = None
+                    self.dirty_sets.add(set_name)
+                    if copy['quantity'] <= quantity:
+                        copies.remove(copy)
+                        if not copies:
+                            del self.collection[card_id]
+                    else:
+                        copy['quantity'] -= quantity
+                    return True
+        return False
+
+    def add_cards(self, cards: Iterable[tuple]) -> List[tuple]:
+        """Add many cards given as (name, set_name[, quantity[, foil]]) tuples.
+
+        Returns the entries that could not be found.
+        """
+        missing = []
+        for entry in cards:
+            card_name, set_name, quantity, foil = card_entry(*entry)
+            card_id = self.find_card_id(card_name, set_name)
+            if card_id is None:
+                missing.append(entry)
+            else:
+                self._add_copy(card_id, set_name, quantity, foil)
+        if missing:
+            print(f"Could not find {len(missing)} cards")
+        return missing
+
+    def remove_cards(self, cards: Iterable[tuple]) -> List[tuple]:
+        """Remove many cards given as (name, set_name[, quantity[, foil]]) tuples.
+
+        Returns the entries that were not in the collection.
+        """
+        missing = []
+        for entry in cards:
+            card_name, set_name, quantity, foil = card_entry(*entry)
+            if not self._remove_copy(card_name, set_name, quantity, foil):
+                missing.append(entry)
+        if missing:
+            print(f"Could not find {len(missing)} cards to remove")
+        return missing
+
+    def set_file(self, set_name: str) -> str:
+        """CSV path for a set: where it was loaded from, or a new file in its set type folder"""
+        filepath = self.set_files.get(set_name)
+        if filepath is None:
+            filepath = os.path.join('organized_sets', set_type_for(set_name), f"{set_name}_with_scryfall.csv")
+            self.set_files[set_name] = filepath
+        return filepath
+
+    def save_collection(self, all_sets: bool = False) -> int:
+        """Save changed sets back to CSV files, returning how many files were written.
+
+        Only sets touched since the last load or save are rendered (every
+        set with all_sets=True), and a file is only replaced when its
+        contents actually differ.
+        """
+        sets_to_save = None if all_sets else self.dirty_sets
+        if sets_to_save is not None and not sets_to_save:
+            return 0
+
         # Group cards by set
-        sets: Dict[str, List[dict]] = {}
+        sets: Dict[str, List[dict]] = {set_name: [] for set_name in (sets_to_save or ())}
         
         for card_id, copies in self.collection.items():
-            card_data = self.scryfall_cards[card_id]
+            card_data = None
             for copy in copies:
                 set_name = copy['set']
-                if set_name not in sets:
-                    sets[set_name] = []
+                if sets_to_save is not None and set_name not in sets_to_save:
+                    continue
+                if card_data is None:
+                    card_data = self.scryfall_cards[card_id]
                 
-                sets[set_name].append({
-                    'Name': card_data['name'],
+                sets.setdefault(set_name, []).append({
+                    'Name': card_data.name,
                     'Set': copy['set'],
                     'Qty': copy['quantity'],
                     'Foil': str(copy['foil']).upper(),
                     'scryfall_id': card_id,
                     'collector_number': copy['collector_number'],
-                    'scryfall_set': card_data.get('set', ''),
-                    'scryfall_rarity': card_data.get('rarity', '')
+                    'scryfall_set': card_data.set,
+                    'scryfall_rarity': card_data.rarity
                 })
 
         # Save each set
+        written = 0
         for set_name, cards in sets.items():
-            # Determine set type (commander, core, masters, etc)
-            set_type = 'standard'  # default
-            set_lower = set_name.lower()
-            if 'commander' in set_lower:
-                set_type = 'commander'
-            elif any(x in set_lower for x in ['masters', 'horizons']):
-                set_type = 'masters'
-            elif 'core' in set_lower or 'edition' in set_lower:
-                set_type = 'core'
-            elif any(x in set_lower for x in ['secret lair', 'universes', 'doctor who']):
-                set_type = 'special'
-            elif 'promo' in set_lower or 'buy-a-box' in set_lower:
-                set_type = 'promo'
-
-            # Create directory if needed
-            dir_path = os.path.join('organized_sets', set_type)
-            os.makedirs(dir_path, exist_ok=True)
-
-            # Save to CSV
-            filepath = os.path.join(dir_path, f"{set_name}_with_scryfall.csv")
-            fieldnames = ['Name', 'Set', 'Qty', 'Foil', 'scryfall_id', 
-                         'collector_number', 'scryfall_set', 'scryfall_rarity']
-            
-            with open(filepath, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(sorted(cards, key=lambda x: int(x['collector_number']) if x['collector_number'].isdigit() else float('inf')))
+            filepath = self.set_file(set_name)
+            if not cards and not os.path.exists(filepath):
+                continue  # A set that was added and emptied again never needs a file
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+            buffer = io.StringIO(newline='')
+            writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDNAMES)
+            writer.writeheader()
+            writer.writerows(sorted(cards, key=lambda x: int(x['collector_number']) if x['collector_number'].isdigit() else float('inf')))
+            if write_if_changed(filepath, buffer.getvalue()):
+                written += 1
+
+        self.dirty_sets.clear()
+        return written
 
 if __name__ == '__main__':
     tracker = CollectionTracker()
@@ -1,66 +1,109 @@
+import argparse
 import csv
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import zip_longest
 from pathlib import Path
 
-def load_csv(file_path):
-    """Load CSV file and return the number of rows."""
-    with open(file_path, 'r', encoding='utf-8') as f:
-        return len(list(csv.DictReader(f)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'tools'))
+from csv_loader import discover_csv_files
+
+# Columns copied from the original CSV that must match row for row
+MATCHED_COLUMNS = ('Name', 'Qty', 'Foil')
+MAX_EXAMPLES = 3  # Row numbers reported per kind of problem
 
 def compare_records(original_file, scryfall_file):
-    """Compare row counts between original and scryfall versions."""
-    original_count = load_csv(original_file)
-    scryfall_count = load_csv(scryfall_file)
-    
-    if original_count != scryfall_count:
-        return f"Row count mismatch: Original={original_count}, Scryfall={scryfall_count}"
-    return None
+    """Stream both versions of a set side by side and check every row.
+
+    Rows are compared in order: the enriched file must have the same number
+    of rows, the same Name/Qty/Foil values and a scryfall_id on each row.
+    Returns (row count of the original, list of problems).
+    """
+    problems = {}  # kind of problem -> line numbers
+
+    with open(original_file, 'r', encoding='utf-8', newline='') as original, \
+         open(scryfall_file, 'r', encoding='utf-8', newline='') as enriched:
+        original_reader = csv.reader(original)
+        enriched_reader = csv.reader(enriched)
+        original_header = next(original_reader, None) or []
+        enriched_header = next(enriched_reader, None) or []
+
+        columns = [c for c in MATCHED_COLUMNS if c in original_header and c in enriched_header]
+        original_positions = [original_header.index(c) for c in columns]
+        enriched_positions = [enriched_header.index(c) for c in columns]
+        id_position = enriched_header.index('scryfall_id') if 'scryfall_id' in enriched_header else None
+
+        original_count = enriched_count = 0
+        for row_number, (original_row, enriched_row) in enumerate(zip_longest(original_reader, enriched_reader), 2):
+            if original_row is not None:
+                original_count += 1
+            if enriched_row is not None:
+                enriched_count += 1
+            if original_row is None or enriched_row is None:
+                continue
+
+            for column, i, j in zip(columns, original_positions, enriched_positions):
+                original_value = original_row[i] if i < len(original_row) else ''
+                enriched_value = enriched_row[j] if j < len(enriched_row) else ''
+                if original_value != enriched_value:
+                    problems.setdefault(f"{column} mismatch", []).append(row_number)
+            if id_position is None or id_position >= len(enriched_row) or not enriched_row[id_position]:
+                problems.setdefault("Missing scryfall_id", []).append(row_number)
+
+    issues = []
+    if original_count != enriched_count:
+        issues.append(f"Row count mismatch: Original={original_count}, Scryfall={enriched_count}")
+    for kind, rows in problems.items():
+        examples = ', '.join(str(r) for r in rows[:MAX_EXAMPLES])
+        more = ', ...' if len(rows) > MAX_EXAMPLES else ''
+        issues.append(f"{kind} on {len(rows)} rows (line {examples}{more})")
+    return original_count, issues
 
 def find_csv_pairs(base_dir):
     """Find pairs of original and _with_scryfall CSVs."""
+    csv_files = set(discover_csv_files(base_dir))
     pairs = []
-    for root, _, files in os.walk(base_dir):
-        csv_files = [f for f in files if f.endswith('.csv')]
-        for file in csv_files:
-            if not file.endswith('_with_scryfall.csv'):
-                scryfall_file = file.replace('.csv', '_with_scryfall.csv')
-                if scryfall_file in csv_files:
-                    pairs.append((
-                        os.path.join(root, file),
-                        os.path.join(root, scryfall_file)
-                    ))
+    for file in sorted(csv_files):
+        if not file.endswith('_with_scryfall.csv'):
+            scryfall_file = file[:-len('.csv')] + '_with_scryfall.csv'
+            if scryfall_file in csv_files:
+                pairs.append((file, scryfall_file))
     return pairs
 
-def verify_all_sets():
+def verify_pair(pair):
+    """Verify one pair, turning exceptions into a reported issue"""
+    original_file, scryfall_file = pair
+    try:
+        return compare_records(original_file, scryfall_file)
+    except Exception as e:
+        return 0, [f"Error: {str(e)}"]
+
+def verify_all_sets(workers=None):
     """Verify all sets in the organized_sets directory."""
     base_dir = "organized_sets"
     pairs = find_csv_pairs(base_dir)
-    
+
     print(f"Found {len(pairs)} CSV pairs to verify")
     print("\nStarting verification...")
-    
+
     issues = {}
     total_records = 0
-    
-    for original_file, scryfall_file in pairs:
-        set_name = Path(original_file).stem
-        print(f"\nVerifying {set_name}...")
-        
-        try:
-            row_count = load_csv(original_file)
+
+    # Pairs are independent, so they're checked in parallel and reported in order
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for (original_file, _), (row_count, set_issues) in zip(pairs, executor.map(verify_pair, pairs, chunksize=4)):
+            set_name = Path(original_file).stem
+            print(f"\nVerifying {set_name}...")
             total_records += row_count
-            
-            issue = compare_records(original_file, scryfall_file)
-            if issue:
-                issues[set_name] = issue
-                print("❌ " + issue)
+
+            if set_issues:
+                issues[set_name] = set_issues
+                for issue in set_issues:
+                    print("❌ " + issue)
             else:
-                print("✓ Matching row counts")
-                
-        except Exception as e:
-            print(f"Error processing {set_name}: {str(e)}")
-            issues[set_name] = f"Error: {str(e)}"
-    
+                print(f"✓ {row_count} rows match")
+
     # Print summary
     print("\n" + "="*50)
     print("VERIFICATION SUMMARY")
@@ -68,18 +111,24 @@ def verify_all_sets():
     print(f"Total sets verified: {len(pairs)}")
     print(f"Total records processed: {total_records}")
     print(f"Sets with mismatches: {len(issues)}")
-    
+
     # Print detailed issues
     if issues:
         print("\nDETAILED MISMATCHES")
         print("="*50)
-        for set_name, issue in issues.items():
+        for set_name, set_issues in issues.items():
             print(f"\n{set_name}:")
-            print(f"  - {issue}")
+            for issue in set_issues:
+                print(f"  - {issue}")
     else:
-        print("\nAll sets have matching row counts! 🎉")
+        print("\nAll sets match row for row! 🎉")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verify _with_scryfall CSVs against their originals")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes for checking pairs (default: CPU count)")
+    args = parser.parse_args()
+
     print("Starting verification of Scryfall data...")
-    verify_all_sets()
+    verify_all_sets(args.workers)
     print("\nVerification complete!")
@@ -0,0 +1,320 @@
+import hashlib
+import os
+import sqlite3
+import sys
+import time
+import unicodedata
+from urllib.request import pathname2url
+
+from scryfall_bulk import iter_scryfall_cards
+
+SNAPSHOT_VERSION = '3'  # Bump when the snapshot schema changes
+HASH_CHUNK_SIZE = 1024 * 1024
+INSERT_BATCH_SIZE = 5000
+
+
+def normalize_name(name: str) -> str:
+    """Normalize a card or set name for lookups: case, accents and spacing are ignored."""
+    decomposed = unicodedata.normalize('NFKD', name)
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(stripped.casefold().split())
+
+
+def clean_set_name(set_name: str) -> str:
+    """Clean set name for matching with Scryfall data."""
+    return set_name.replace("_", " ").strip()
+
+
+def snapshot_path(source: str) -> str:
+    """Where the compiled snapshot of a bulk file lives (next to the file)"""
+    return os.path.splitext(source)[0] + '.catalog.sqlite'
+
+
+def file_hash(path: str) -> str:
+    """blake2b digest of a file's contents, read in chunks"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_price(value):
+    """Scryfall prices are strings or null"""
+    return float(value) if value else None
+
+
+class CatalogCard:
+    """The fields of a Scryfall card the collection tools actually use.
+
+    Full card objects carry oracle text, legalities, image URIs and more;
+    keeping only these slots (with interned strings and prices parsed once)
+    makes a loaded catalog a small fraction of the JSON's size.
+    """
+    __slots__ = ('id', 'name', 'set_name', 'set', 'collector_number', 'rarity', 'usd', 'usd_foil')
+
+    def __init__(self, id, name, set_name, set, collector_number, rarity, usd=None, usd_foil=None):
+        self.id = id
+        self.name = name
+        self.set_name = set_name
+        self.set = set
+        self.collector_number = collector_number
+        self.rarity = rarity
+        self.usd = usd
+        self.usd_foil = usd_foil
+
+    def price(self, foil: bool):
+        return self.usd_foil if foil else self.usd
+
+
+CARD_COLUMNS = 'id, name, set_name, set_code, collector_number, rarity, usd, usd_foil'
+JOINED_CARD_COLUMNS = ', '.join(f'cards.{column}' for column in CARD_COLUMNS.split(', '))
+
+
+def catalog_row(card: dict) -> tuple:
+    """Flatten a Scryfall card into a snapshot row"""
+    image_uris = card.get('image_uris', {})
+    if not image_uris and 'card_faces' in card:
+        image_uris = card['card_faces'][0].get('image_uris', {})
+    prices = card.get('prices') or {}
+    set_name = card.get('set_name', '')
+    return (
+        card['id'],
+        card['name'],
+        set_name,
+        normalize_name(set_name),
+        card.get('set', '').lower(),
+        str(card.get('collector_number', '')),
+        card.get('rarity', ''),
+        parse_price(prices.get('usd')),
+        parse_price(prices.get('usd_foil')),
+        image_uris.get('normal', ''),
+        image_uris.get('art_crop', ''),
+        1 if 'paper' in card.get('games', ()) else 0,
+    )
+
+
+def build_snapshot(source: str, path: str, digest: str = None):
+    """Compile a Scryfall bulk file into an indexed SQLite snapshot.
+
+    The snapshot is written to a temporary file and moved into place, so
+    readers never see a half-built catalog.
+    """
+    started = time.time()
+    digest = digest or file_hash(source)
+    stat = os.stat(source)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+    conn = sqlite3.connect(temp_path, isolation_level=None)
+    try:
+        conn.execute('PRAGMA journal_mode = OFF')
+        conn.execute('PRAGMA synchronous = OFF')
+        conn.execute('BEGIN')
+        conn.execute('CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+        conn.execute('''
+            CREATE TABLE cards (
+                id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                set_name TEXT NOT NULL,
+                set_name_key TEXT NOT NULL,
+                set_code TEXT NOT NULL,
+                collector_number TEXT NOT NULL,
+                rarity TEXT NOT NULL,
+                usd REAL,
+                usd_foil REAL,
+                image_normal TEXT NOT NULL,
+                image_art_crop TEXT NOT NULL,
+                paper INTEGER NOT NULL
+            )
+        ''')
+        # Normalized full and face names, for lookups from OCR'd or hand-typed text
+        conn.execute('CREATE TABLE card_names (name_key TEXT NOT NULL, id TEXT NOT NULL)')
+
+        batch = []
+        names = []
+        count = 0
+        for card in iter_scryfall_cards(source):
+            batch.append(catalog_row(card))
+            keys = {normalize_name(card['name'])}
+            keys.update(normalize_name(face) for face in card['name'].split(' // '))
+            names.extend((key, card['id']) for key in keys)
+            if len(batch) >= INSERT_BATCH_SIZE:
+                conn.executemany('INSERT OR IGNORE INTO cards VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', batch)
+                conn.executemany('INSERT INTO card_names VALUES (?, ?)', names)
+                count += len(batch)
+                batch = []
+                names = []
+        conn.executemany('INSERT OR IGNORE INTO cards VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', batch)
+        conn.executemany('INSERT INTO card_names VALUES (?, ?)', names)
+        count += len(batch)
+
+        # Indexes are built once after loading, which is much faster than maintaining them per row
+        conn.execute('CREATE INDEX idx_cards_name_set ON cards(name, set_name_key)')
+        conn.execute('CREATE INDEX idx_cards_set_number ON cards(set_code, collector_number)')
+        conn.execute('CREATE INDEX idx_card_names_key ON card_names(name_key)')
+        conn.executemany('INSERT INTO meta (key, value) VALUES (?, ?)', [
+            ('version', SNAPSHOT_VERSION),
+            ('source_hash', digest),
+            ('source_size', str(stat.st_size)),
+            ('source_mtime', repr(stat.st_mtime)),
+        ])
+        conn.execute('COMMIT')
+    finally:
+        conn.close()
+
+    os.replace(temp_path, path)
+    print(f"Compiled {count} cards from {source} into {path} in {time.time() - started:.1f}s")
+
+
+def read_meta(path: str) -> dict:
+    """Snapshot metadata, or {} if the snapshot is missing or unreadable"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        conn = sqlite3.connect(path)
+        try:
+            return dict(conn.execute('SELECT key, value FROM meta'))
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError:
+        return {}
+
+
+def ensure_snapshot(source: str, path: str = None) -> str:
+    """Make sure the snapshot of source is current, rebuilding it if not.
+
+    An unchanged size and mtime is trusted without reading the source.
+    Otherwise the source is hashed; if only the mtime moved (say, after a
+    copy) the stored stat is refreshed instead of recompiling.
+    """
+    path = path or snapshot_path(source)
+    meta = read_meta(path)
+    stat = os.stat(source)
+
+    if meta.get('version') == SNAPSHOT_VERSION:
+        if meta.get('source_size') == str(stat.st_size) and meta.get('source_mtime') == repr(stat.st_mtime):
+            return path
+        digest = file_hash(source)
+        if meta.get('source_hash') == digest:
+            conn = sqlite3.connect(path)
+            with conn:
+                conn.executemany('UPDATE meta SET value = ? WHERE key = ?', [
+                    (str(stat.st_size), 'source_size'),
+                    (repr(stat.st_mtime), 'source_mtime'),
+                ])
+            conn.close()
+            return path
+    else:
+        digest = None
+
+    build_snapshot(source, path, digest)
+    return path
+
+
+class CardCatalog:
+    """Read-only card lookups backed by a compiled snapshot of a bulk file.
+
+    Opening only checks the snapshot is current and opens SQLite, so it takes
+    milliseconds; cards are read through the snapshot's indexes on demand
+    and kept as CatalogCard records once fetched.
+    """
+
+    def __init__(self, source: str, path: str = None):
+        self.source = source
+        self.path = ensure_snapshot(source, path)
+        uri = f"file:{pathname2url(os.path.abspath(self.path))}?mode=ro"
+        self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        self._records = {}
+
+    def _record(self, row) -> CatalogCard:
+        return CatalogCard(row[0], sys.intern(row[1]), sys.intern(row[2]), sys.intern(row[3]),
+                           row[4], sys.intern(row[5]), row[6], row[7])
+
+    def get(self, card_id: str, default=None):
+        """CatalogCard for an id, or default if the id is unknown"""
+        record = self._records.get(card_id)
+        if record is None:
+            row = self._conn.execute(f'SELECT {CARD_COLUMNS} FROM cards WHERE id = ?', [card_id]).fetchone()
+            if row is None:
+                return default
+            record = self._records[card_id] = self._record(row)
+        return record
+
+    def __getitem__(self, card_id: str) -> CatalogCard:
+        record = self.get(card_id)
+        if record is None:
+            raise KeyError(card_id)
+        return record
+
+    def __contains__(self, card_id: str) -> bool:
+        return self.get(card_id) is not None
+
+    def __len__(self) -> int:
+        return self._conn.execute('SELECT COUNT(*) FROM cards').fetchone()[0]
+
+    def ids_by_name(self, name: str) -> list:
+        """Ids of every printing with this exact name, in bulk file order"""
+        return [row[0] for row in self._conn.execute(
+            'SELECT id FROM cards WHERE name = ? ORDER BY rowid', [name])]
+
+    def find(self, name: str, set_name: str):
+        """Id of the first printing with this name in a set (set names compare like normalize_name)"""
+        row = self._conn.execute(
+            'SELECT id FROM cards WHERE name = ? AND set_name_key = ? ORDER BY rowid LIMIT 1',
+            [name, normalize_name(set_name)]
+        ).fetchone()
+        return row[0] if row else None
+
+    def _first_printing(self, name_key: str, where: str = '', params=()):
+        row = self._conn.execute(f'''
+            SELECT {JOINED_CARD_COLUMNS} FROM card_names JOIN cards ON cards.id = card_names.id
+            WHERE card_names.name_key = ? AND cards.paper = 1{where}
+            ORDER BY card_names.rowid LIMIT 1
+        ''', [name_key, *params]).fetchone()
+        if row is None:
+            return None
+        record = self._records.get(row[0])
+        if record is None:
+            record = self._records[row[0]] = self._record(row)
+        return record
+
+    def resolve(self, name: str, set_name: str = None, collector_number: str = None):
+        """The paper printing a collection row or scan means, or None if the name is unknown.
+
+        Case, accents and spacing are ignored and either face of a
+        multi-faced card matches. Prefers a printing from exactly set_name,
+        then one whose set name contains it, in both cases with a matching
+        collector number when one is given; then falls back to the first
+        printing of the card, like the online lookup.
+        """
+        name_key = normalize_name(name)
+        set_key = normalize_name(clean_set_name(set_name or ''))
+        number = ' AND cards.collector_number = ?' if collector_number else ''
+        number_params = [str(collector_number)] if collector_number else []
+        return (self._first_printing(name_key, ' AND cards.set_name_key = ?' + number, [set_key] + number_params)
+                or self._first_printing(name_key, ' AND instr(cards.set_name_key, ?) > 0' + number,
+                                        [set_key] + number_params)
+                or self._first_printing(name_key))
+
+    def lookup_name(self, name: str, set_name: str = None):
+        """Id of the printing resolve() picks for a loosely written name, or None"""
+        card = self.resolve(name, set_name)
+        return card.id if card else None
+
+    def find_by_number(self, set_code: str, collector_number: str):
+        """Id of a printing by set code and collector number"""
+        row = self._conn.execute(
+            'SELECT id FROM cards WHERE set_code = ? AND collector_number = ? ORDER BY rowid LIMIT 1',
+            [set_code.lower(), str(collector_number)]
+        ).fetchone()
+        return row[0] if row else None
+
+    def iter_rows(self, columns: str, paper_only: bool = False):
+        """Stream raw snapshot rows with the given columns, in bulk file order"""
+        where = ' WHERE paper = 1' if paper_only else ''
+        return self._conn.execute(f'SELECT {columns} FROM cards{where} ORDER BY rowid')
+
+    def close(self):
+        self._conn.close()
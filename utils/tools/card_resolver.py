@@ -0,0 +1,51 @@
+import os
+import threading
+import time
+
+from card_catalog import CardCatalog, clean_set_name, normalize_name
+
+
+class CardResolver:
+    """Offline card lookups for the enrichment scripts, backed by a CardCatalog.
+
+    Matching rules live in CardCatalog.resolve, so the scripts resolve rows
+    exactly like the bulk scanner and share its compiled snapshot of the
+    bulk file instead of indexing the JSON on every run. Lookups may come
+    from several threads and, after a fork, from worker processes; each
+    process opens its own connection and threads take turns on it.
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self._lock = threading.Lock()
+        self._catalog = None
+        self._pid = None
+
+    def _catalog_for_process(self) -> CardCatalog:
+        # SQLite connections must not be used across a fork
+        if self._pid != os.getpid():
+            self._catalog = CardCatalog(self.source)
+            self._pid = os.getpid()
+        return self._catalog
+
+    @classmethod
+    def from_bulk_file(cls, path: str) -> 'CardResolver':
+        """Open a resolver for a bulk data file, compiling its snapshot if needed"""
+        started = time.time()
+        resolver = cls(path)
+        with resolver._lock:
+            count = len(resolver._catalog_for_process())
+        print(f"Opened catalog of {count} cards for {path} in {time.time() - started:.1f}s")
+        return resolver
+
+    def lookup_number(self, set_code: str, collector_number: str):
+        """Exact printing by set code and collector number"""
+        with self._lock:
+            catalog = self._catalog_for_process()
+            card_id = catalog.find_by_number(set_code, collector_number)
+            return catalog.get(card_id) if card_id else None
+
+    def resolve(self, name: str, set_name: str, collector_number: str = None):
+        """Find the printing for a collection row, or None if the name is unknown (see CardCatalog.resolve)"""
+        with self._lock:
+            return self._catalog_for_process().resolve(name, set_name, collector_number)
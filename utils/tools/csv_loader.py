@@ -0,0 +1,128 @@
+import csv
+import os
+import pickle
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_CACHE_PATH = os.environ.get(
+    'CSV_CACHE_PATH',
+    os.path.join(os.path.expanduser('~'), '.cache', 'mtg-collection', 'csv-rows.pickle')
+)
+CACHE_VERSION = 1
+MIN_FILES_FOR_POOL = 8  # Below this, starting worker processes costs more than it saves
+
+# Rows of one CSV file as tuples of the requested columns; `changed` is False
+# when they came from the cache because the file is unchanged since last time
+CsvBatch = namedtuple('CsvBatch', ['path', 'rows', 'changed'])
+
+
+def discover_csv_files(base_dir: str, suffix: str = '.csv') -> list:
+    """Every file under base_dir ending in suffix, sorted"""
+    paths = []
+    for root, _, files in os.walk(base_dir):
+        for file in files:
+            if file.endswith(suffix):
+                paths.append(os.path.join(root, file))
+    paths.sort()
+    return paths
+
+
+def parse_csv_file(path: str, columns: tuple) -> list:
+    """Read a CSV file into a list of tuples holding only `columns` ('' when a column is absent)"""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None) or []
+        positions = [header.index(column) if column in header else None for column in columns]
+        width = len(header)
+        rows = []
+        for record in reader:
+            if len(record) < width:
+                record += [''] * (width - len(record))
+            rows.append(tuple(record[i] if i is not None else '' for i in positions))
+        return rows
+
+
+def _file_signature(path: str) -> tuple:
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+class CsvLoader:
+    """Parses collection CSVs in a process pool, with a persistent per-file cache.
+
+    The cache maps each file's absolute path and requested columns to its
+    (size, mtime) and parsed rows, so files that haven't changed since the
+    last run are not opened at all. Call save() to persist the cache.
+    """
+
+    def __init__(self, cache_path: str = DEFAULT_CACHE_PATH, processes: int = None):
+        self.cache_path = cache_path
+        self.processes = processes or os.cpu_count() or 1
+        self._cache = self._read_cache()
+        self._dirty = False
+
+    def _read_cache(self) -> dict:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, 'rb') as f:
+                version, entries = pickle.load(f)
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+            return {}
+        return entries if version == CACHE_VERSION else {}
+
+    def load(self, paths: list, columns: tuple) -> list:
+        """CsvBatch for each path, in order; only new or modified files are parsed"""
+        columns = tuple(columns)
+        started = time.time()
+        batches = {}
+        to_parse = []
+        for path in paths:
+            key = (os.path.abspath(path), columns)
+            signature = _file_signature(path)
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] == signature:
+                batches[path] = CsvBatch(path, entry[1], False)
+            else:
+                to_parse.append((path, key, signature))
+
+        if len(to_parse) >= MIN_FILES_FOR_POOL and self.processes > 1:
+            with ProcessPoolExecutor(max_workers=self.processes) as executor:
+                parsed = executor.map(parse_csv_file, [p for p, _, _ in to_parse],
+                                      [columns] * len(to_parse), chunksize=4)
+                results = list(parsed)
+        else:
+            results = [parse_csv_file(path, columns) for path, _, _ in to_parse]
+
+        for (path, key, signature), rows in zip(to_parse, results):
+            self._cache[key] = (signature, rows)
+            batches[path] = CsvBatch(path, rows, True)
+        if to_parse:
+            self._dirty = True
+
+        print(f"Loaded {len(paths)} CSV files ({len(to_parse)} parsed, "
+              f"{len(paths) - len(to_parse)} unchanged) in {time.time() - started:.2f}s")
+        return [batches[path] for path in paths]
+
+    def save(self):
+        """Write the cache back to disk (atomically) if anything was parsed"""
+        if not self.cache_path or not self._dirty:
+            return
+        # Drop entries for files that no longer exist
+        self._cache = {key: entry for key, entry in self._cache.items() if os.path.exists(key[0])}
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+        temp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            pickle.dump((CACHE_VERSION, self._cache), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, self.cache_path)
+        self._dirty = False
+
+
+def load_csv_rows(base_dir: str, columns: tuple, suffix: str = '_with_scryfall.csv',
+                  cache_path: str = DEFAULT_CACHE_PATH, processes: int = None) -> list:
+    """Discover and load every matching CSV under base_dir, then persist the cache"""
+    loader = CsvLoader(cache_path, processes)
+    batches = loader.load(discover_csv_files(base_dir, suffix), columns)
+    loader.save()
+    return batches
@@ -0,0 +1,82 @@
+import json
+import os
+import time
+
+CHUNK_SIZE = 1024 * 1024  # Read the bulk file 1 MB at a time
+PROGRESS_INTERVAL = 10000  # Report progress every N cards
+
+_WHITESPACE = ' \t\r\n'
+
+
+def iter_scryfall_cards(path, progress=True):
+    """Stream cards from a Scryfall bulk data file one at a time.
+
+    The bulk files are a single JSON array of card objects. Instead of
+    loading the whole array with json.load, the file is read in fixed-size
+    chunks and each object is decoded as soon as it is complete, so memory
+    stays flat no matter how large the file is.
+    """
+    decoder = json.JSONDecoder()
+    total_bytes = os.path.getsize(path)
+    bytes_read = 0
+    count = 0
+    started = time.time()
+
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = ''
+        pos = 0
+        in_array = False
+        eof = False
+
+        while True:
+            # Skip whitespace and separators between cards
+            while pos < len(buffer) and (buffer[pos] in _WHITESPACE or (in_array and buffer[pos] == ',')):
+                pos += 1
+
+            if pos < len(buffer):
+                if not in_array:
+                    if buffer[pos] != '[':
+                        raise ValueError(f"Expected a JSON array in {path}")
+                    in_array = True
+                    pos += 1
+                    continue
+                if buffer[pos] == ']':
+                    break
+
+                try:
+                    card, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    # Object is split across chunks - read more before retrying
+                    if eof:
+                        raise
+                    card = None
+
+                if card is not None:
+                    pos = end
+                    count += 1
+                    if progress and count % PROGRESS_INTERVAL == 0:
+                        _print_progress(count, bytes_read, total_bytes, started)
+                    yield card
+                    continue
+
+            if eof:
+                if not in_array:
+                    raise ValueError(f"Expected a JSON array in {path}")
+                raise ValueError(f"Unexpected end of file in {path}")
+
+            # Drop consumed text and pull in the next chunk
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                eof = True
+            bytes_read += len(chunk.encode('utf-8')) if chunk else 0
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+    if progress:
+        _print_progress(count, total_bytes, total_bytes, started)
+
+
+def _print_progress(count, bytes_read, total_bytes, started):
+    elapsed = max(time.time() - started, 1e-6)
+    percent = (bytes_read / total_bytes * 100) if total_bytes else 100.0
+    print(f"  {count} cards parsed ({percent:.1f}% of file, {count / elapsed:.0f} cards/s)")
@@ -0,0 +1,115 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from card_catalog import normalize_name
+
+DEFAULT_CACHE_PATH = os.environ.get(
+    'SCRYFALL_CACHE_PATH',
+    os.path.join(os.path.expanduser('~'), '.cache', 'mtg-collection', 'scryfall.sqlite')
+)
+DEFAULT_TTL = 30 * 24 * 3600  # Card ids and printings rarely change
+DEFAULT_MAX_ENTRIES = 100000
+EVICT_CHECK_INTERVAL = 500  # Check the size limit every N writes
+
+MISSING = object()  # Returned by get() on a cache miss, since None is a valid cached value
+
+
+def cache_key(kind: str, *parts) -> str:
+    """Build a cache key from a request kind and its normalized query parts"""
+    return '|'.join([kind] + [normalize_name(str(p)) if p is not None else '' for p in parts])
+
+
+class ResponseCache:
+    """Persistent, size-bounded cache of Scryfall responses stored in SQLite.
+
+    Entries expire after `ttl` seconds; once more than `max_entries` are
+    stored, the least recently used ones are evicted. Hit and miss counts
+    are kept for the lifetime of the object.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl: float = DEFAULT_TTL,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode = WAL')
+        self._conn.execute('PRAGMA synchronous = NORMAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed)')
+
+    def get(self, key: str, default=MISSING):
+        """Return the cached value for key, or default if absent or expired"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, created FROM responses WHERE key = ?', [key]
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    self._conn.execute('DELETE FROM responses WHERE key = ?', [key])
+                self.misses += 1
+                return default
+            self._conn.execute('UPDATE responses SET accessed = ? WHERE key = ?', [now, key])
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value):
+        """Store a JSON-serializable value"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute('''
+                INSERT INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    value = excluded.value,
+                    created = excluded.created,
+                    accessed = excluded.accessed
+            ''', [key, json.dumps(value), now, now])
+            self._writes += 1
+            if self._writes % EVICT_CHECK_INTERVAL == 0:
+                self._evict()
+
+    def _evict(self):
+        """Drop expired entries, then least recently used ones beyond max_entries"""
+        self._conn.execute('DELETE FROM responses WHERE created < ?', [time.time() - self.ttl])
+        count = self._conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute('''
+                DELETE FROM responses WHERE key IN (
+                    SELECT key FROM responses ORDER BY accessed LIMIT ?
+                )
+            ''', [count - self.max_entries])
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            size = self._conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'entries': size,
+        }
+
+    def close(self):
+        with self._lock:
+            self._evict()
+            self._conn.close()
@@ -0,0 +1,107 @@
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Base URL of the Scryfall API; point it at a local stand-in for testing
+SCRYFALL_API_URL = os.environ.get("SCRYFALL_API_URL", "https://api.scryfall.com")
+REQUESTS_PER_SECOND = 10  # Scryfall's published limit
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5  # Seconds; doubled on each retry
+BACKOFF_MAX = 30.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread-safe token bucket limiting how often requests start.
+
+    With the default capacity of one token, calls are spaced exactly
+    1/rate seconds apart no matter how many threads share the bucket.
+    """
+
+    def __init__(self, rate: float = REQUESTS_PER_SECOND, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Reserve the token now and sleep off any deficit outside the lock
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+
+class ScryfallClient:
+    """Scryfall HTTP client with a pooled session, global rate limit and bounded retries."""
+
+    def __init__(self, base_url: str = SCRYFALL_API_URL, limiter: TokenBucket = None,
+                 max_retries: int = MAX_RETRIES, pool_size: int = 16):
+        self.base_url = base_url.rstrip('/')
+        self.limiter = limiter or TokenBucket()
+        self.max_retries = max_retries
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'User-Agent': 'mtg-collection-manager/0.1',
+            'Accept': 'application/json',
+        })
+
+    def _backoff(self, attempt: int, response=None) -> float:
+        """Seconds to wait before retry number `attempt`, honoring Retry-After"""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after:
+                try:
+                    return min(float(retry_after), BACKOFF_MAX)
+                except ValueError:
+                    pass
+        delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)
+        return delay * random.uniform(0.5, 1.0)
+
+    def get(self, path: str, params: dict = None, timeout: float = 30) -> requests.Response:
+        """GET an API path. Rate-limited and retried on 429/5xx and connection errors.
+
+        Returns the final response (which may still be an error status once
+        retries are exhausted); re-raises the last connection error.
+        """
+        url = f"{self.base_url}{path}"
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            try:
+                response = self.session.get(url, params=params, timeout=timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self._backoff(attempt))
+                continue
+
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                return response
+            time.sleep(self._backoff(attempt, response))
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> ScryfallClient:
+    """Process-wide client, so every thread shares one session and one rate limit"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = ScryfallClient()
+        return _client